@@ -5,6 +5,8 @@ from .displayPrereqs import DisplayPrereqs
 from .plan import Plan, PlanItem
 from .users import User, UserProfile
 from .gradeDistribution import GradeDistribution
+from .gradeRollup import GradeRollup
 
 # Create your models here.
 
+from .coursePrereqDepth import CoursePrereqDepth
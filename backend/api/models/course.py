@@ -11,6 +11,14 @@ class Course(models.Model):
     created_at = models.DateTimeField(null=True)
     updated_at = models.DateTimeField(null=True)
     requisites_parsed = models.JSONField(null=True)
+    # "<SUBJECT CODE> <NUMBER>" upper-cased with single spaces, e.g. "COM SCI M151B".
+    # Maintained by triggers installed with scripts/build_label_index.py.
+    label_key = models.CharField(max_length=96, null=True, db_index=True)
+    # requisites_parsed compiled to a postfix program (api.services.prereqs.compile_requisites)
+    # and the updated_at it was compiled from; stale when that no longer matches.
+    # Filled by scripts/compile_requisites.py.
+    requisites_program = models.JSONField(null=True)
+    requisites_compiled_at = models.DateTimeField(null=True)
     
     class Meta:
         db_table = "courses"     # EXACT table name in Supabase
@@ -0,0 +1,12 @@
+from django.db import models
+
+class CoursePrereqDepth(models.Model):
+    course_id = models.BigIntegerField(primary_key=True)
+    layer = models.IntegerField(null=True)          # earliest term index; null = unsatisfiable (cycle)
+    chain_length = models.IntegerField(null=True)   # longest prerequisite chain; null = on or behind a cycle
+    in_cycle = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "course_prereq_depths"     # created by scripts/compute_prereq_depths.py
+        managed = False                 # DON'T let Django try to create or migrate this table
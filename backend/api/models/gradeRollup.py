@@ -0,0 +1,17 @@
+from django.db import models
+
+class GradeRollup(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    course_id = models.BigIntegerField()
+    instructor = models.TextField(default="")   # "" = all instructors of the course
+    grades_json = models.JSONField()            # summed {grade: count}
+    terms = models.JSONField()                  # [{"term", "graded", "enrolled"}]
+    graded = models.IntegerField()
+    total_enrolled = models.IntegerField()
+    offerings = models.IntegerField()
+    mean_gpa = models.DecimalField(max_digits=4, decimal_places=3, null=True)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "grade_rollups"     # created by scripts/import_grades.py
+        managed = False                 # DON'T let Django try to create or migrate this table
@@ -51,6 +51,9 @@ class PlanItem(models.Model):
     course_id = models.BigIntegerField()
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.PLANNED)
     position = models.IntegerField(default=0)
+    # Fractional order within the (year_index, term) cell, see api.services.ordering.
+    # Added and backfilled by scripts/add_plan_sort_keys.py.
+    sort_key = models.CharField(max_length=64, null=True, db_collation="C")
     notes = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -66,6 +69,6 @@ class PlanItem(models.Model):
             ),
         ]
         indexes = [
-            models.Index(fields=["plan", "year_index", "term"], name="idx_plan_cell"),
+            models.Index(fields=["plan", "year_index", "term", "sort_key"], name="idx_plan_cell"),
             models.Index(fields=["plan"], name="idx_plan"),
         ]
@@ -0,0 +1,67 @@
+"""
+Prefix index for course autocomplete.
+
+Labels are indexed with all whitespace removed so "COMSCI31", "com sci31" and
+"COM SCI 31" all land on the same entries; titles are indexed both from the
+start and from every later word. Lookups are a bisect into sorted arrays.
+"""
+import bisect
+import re
+
+from api.services.catalog import get_catalog, normalize_label
+from api.services.search import STOP_WORDS
+
+
+def compact(text):
+    return re.sub(r"\s+", "", str(text).upper())
+
+
+class _SortedKeys:
+    def __init__(self, entries):
+        entries = sorted(set(entries))
+        self.keys = [k for k, _ in entries]
+        self.ids = [cid for _, cid in entries]
+
+    def scan(self, prefix, limit, seen, out):
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(out) < limit and self.keys[i].startswith(prefix):
+            if self.ids[i] not in seen:
+                seen.add(self.ids[i])
+                out.append(self.ids[i])
+            i += 1
+
+
+class AutocompleteIndex:
+    def __init__(self, snapshot):
+        title_starts, title_words = [], []
+        for c in snapshot.courses:
+            words = normalize_label(c["title"]).split(" ")
+            title_starts.append((" ".join(words), c["id"]))
+            for j in range(1, len(words)):
+                if words[j] not in STOP_WORDS:
+                    title_words.append((" ".join(words[j:]), c["id"]))
+        # Best match kind first: label, start of title, later word in title.
+        self._tiers = (
+            (True, _SortedKeys((compact(c["label_key"]), c["id"]) for c in snapshot.courses)),
+            (False, _SortedKeys(title_starts)),
+            (False, _SortedKeys(title_words)),
+        )
+
+    def lookup(self, prefix, limit):
+        """Course ids for the top `limit` completions of `prefix`."""
+        compact_prefix, spaced_prefix = compact(prefix), normalize_label(prefix)
+        if not compact_prefix:
+            return []
+        seen, out = set(), []
+        for is_label, keys in self._tiers:
+            keys.scan(compact_prefix if is_label else spaced_prefix, limit, seen, out)
+            if len(out) >= limit:
+                break
+        return out
+
+
+def autocomplete(prefix, limit):
+    """Returns the course records completing `prefix`, best first."""
+    snapshot = get_catalog()
+    index = snapshot.derived("autocomplete", AutocompleteIndex)
+    return [snapshot.by_id[cid] for cid in index.lookup(prefix, limit)]
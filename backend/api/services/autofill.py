@@ -0,0 +1,341 @@
+"""
+Draft schedule generator for /plans/<id>/autofill/.
+
+1. Selection: for every requirement block (see planning.requirement_blocks)
+   still short of its `needs`, pick the options that cost the fewest extra
+   courses, where a course's cost includes whatever prerequisites it still
+   lacks (cheapest alternative of each OR).
+2. Greedy list scheduling: walk the open terms in order and fill each one,
+   up to its unit cap, with the courses whose requisites are met by earlier
+   terms, longest remaining dependent chain first.
+3. Local search: until the time budget runs out, try random moves and swaps
+   of the placed courses (and placements of any left over), keeping every
+   change that does not make the schedule worse: fewer unplaced courses,
+   then an earlier last term, then more even unit loads.
+
+Existing plan items and classes already taken stay where they are; only new
+items are proposed.
+"""
+import random
+import time
+
+from api.models.plan import PlanItem
+from api.services.catalog import parse_units
+from api.services.planning import MAX_YEAR_INDEX, TAKEN_SLOT, TERM_ORDER, first_slots, slot
+from api.services.prereqs import OR, decode_op, evaluate
+
+DEFAULT_YEARS = 4
+DEFAULT_TERMS = (PlanItem.Term.FALL, PlanItem.Term.WINTER, PlanItem.Term.SPRING)
+DEFAULT_UNIT_CAP = 16
+DEFAULT_COURSE_UNITS = 4.0
+DEFAULT_BUDGET_MS = 300
+MAX_BUDGET_MS = 2000
+# Local search stops early after this many tries without a strictly better schedule.
+MAX_STALE_ITERATIONS = 5000
+
+
+class _Selector:
+    """Picks the courses that close the requirement blocks, with their missing prerequisites."""
+
+    def __init__(self, graph, have):
+        self.graph = graph
+        self.have = set(have)
+        self.chosen = set()
+        self.timed_out = False
+        self._memo = {}
+
+    def cost(self, course_id):
+        """
+        (n, courses) for the cheapest set of not-yet-had courses that makes
+        `course_id` takeable, itself included; None if a cycle blocks it.
+
+        Prerequisite edges that graph.breaks_cycle() marks are treated as
+        unusable, so the walk runs over a DAG and every course's cost is
+        computed once until the next take().
+        """
+        if course_id in self.have or course_id in self.chosen:
+            return 0, frozenset()
+        if course_id in self._memo:
+            return self._memo[course_id]
+        stack = []
+        for op in self.graph.program(course_id):
+            if op >= 0:
+                if op in self.have or op in self.chosen:
+                    stack.append((0, frozenset()))
+                elif self.graph.breaks_cycle(course_id, op):
+                    stack.append(None)
+                else:
+                    stack.append(self.cost(op))
+                continue
+            kind, n = decode_op(op)
+            children = stack[-n:]
+            del stack[-n:]
+            if kind == OR:
+                options = [c for c in children if c is not None]
+                stack.append(min(options, key=lambda c: (c[0], sorted(c[1]))) if options else None)
+            elif None in children:
+                stack.append(None)
+            else:
+                courses = frozenset().union(*(c[1] for c in children))
+                stack.append((len(courses), courses))
+
+        need = stack[-1] if stack else (0, frozenset())
+        if need is None:
+            result = None
+        else:
+            courses = need[1] | {course_id}
+            result = (len(courses), courses)
+        self._memo[course_id] = result
+        return result
+
+    def take(self, courses):
+        self.chosen |= courses
+        self._memo.clear()
+
+    def satisfy(self, blocks, deadline=None):
+        """
+        Chooses courses for every block; returns [(block, options still short)].
+        Past `deadline` (time.monotonic()) the blocks not yet worked through
+        are reported short as they stand.
+        """
+        unmet = []
+        for block in blocks:
+            met = sum(1 for option in block["options"] if any(c in self.have or c in self.chosen for c in option))
+            short = block["needs"] - met
+            while short > 0:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.timed_out = True
+                    break
+                best = None   # ((n, course_id), courses)
+                for option in block["options"]:
+                    if any(c in self.have or c in self.chosen for c in option):
+                        continue
+                    for course_id in option:
+                        cost = self.cost(course_id)
+                        if cost is not None and (best is None or (cost[0], course_id) < best[0]):
+                            best = ((cost[0], course_id), cost[1])
+                if best is None:
+                    break
+                self.take(best[1])
+                short -= 1
+            if short > 0:
+                unmet.append((block, short))
+        return unmet
+
+
+class _Schedule:
+    """Cells, their unit loads and the slot of every placed course."""
+
+    def __init__(self, graph, cells, caps, loads, fixed_slots, units, occupied=frozenset()):
+        self.graph = graph
+        self.cells = cells                  # [(year_index, term)] in order
+        self.slots = [slot(y, t) for y, t in cells]
+        self.caps = caps
+        self.loads = list(loads)            # units per cell, existing items included
+        self.fixed = fixed_slots            # course_id -> slot for taken / existing items
+        self.units = units
+        self.occupied = occupied            # (cell index, course_id) of existing items, dropped ones too
+        self.placed = {}                    # course_id -> cell index, new courses only
+
+    def slot_of(self, course_id):
+        cell = self.placed.get(course_id)
+        if cell is not None:
+            return self.slots[cell]
+        return self.fixed.get(course_id)
+
+    def ready(self, course_id, at, moving=None, moved_to=None):
+        """Whether course_id's requisites are met before slot `at` (optionally with `moving` at `moved_to`)."""
+        def before(c):
+            s = moved_to if c == moving else self.slot_of(c)
+            return s is not None and s < at
+        return evaluate(self.graph.program(course_id), before)
+
+    def fits(self, cell, course_id):
+        # A cell holds a course at most once (uniq_plan_year_term_course), even as a dropped item.
+        if (cell, course_id) in self.occupied:
+            return False
+        return self.loads[cell] + self.units[course_id] <= self.caps[cell]
+
+    def place(self, course_id, cell):
+        self.placed[course_id] = cell
+        self.loads[cell] += self.units[course_id]
+
+    def unplace(self, course_id):
+        cell = self.placed.pop(course_id)
+        self.loads[cell] -= self.units[course_id]
+
+    def can_move(self, course_id, source, cell):
+        """
+        Moving (unplaced) course_id from cell `source` to `cell` keeps its own
+        requisites met and breaks none of the dependents that were met.
+        """
+        was, to = self.slots[source], self.slots[cell]
+        if not self.ready(course_id, to):
+            return False
+        for dependent in self.graph.dependents(course_id):
+            at = self.slot_of(dependent)
+            if at is None or at == TAKEN_SLOT:
+                continue
+            if self.ready(dependent, at, course_id, was) and not self.ready(dependent, at, course_id, to):
+                return False
+        return True
+
+    def score(self, pending):
+        last = max(self.placed.values(), default=-1)
+        return (len(pending), last, sum(load * load for load in self.loads))
+
+
+def _heights(graph, courses):
+    """Longest chain of dependents among `courses` hanging off each of them."""
+    heights = {}
+
+    def height(course_id, visiting):
+        if course_id in heights:
+            return heights[course_id]
+        visiting.add(course_id)
+        best = 0
+        for dependent in graph.dependents(course_id):
+            if dependent in courses and dependent not in visiting:
+                best = max(best, 1 + height(dependent, visiting))
+        visiting.discard(course_id)
+        heights[course_id] = best
+        return best
+
+    for course_id in courses:
+        height(course_id, set())
+    return heights
+
+
+def open_cells(items, years, terms):
+    """Cells from the first term after the last completed / enrolled item on, in order."""
+    done = [
+        slot(it["year_index"], it["term"]) for it in items
+        if it["status"] in (PlanItem.Status.COMPLETED, PlanItem.Status.ENROLLED)
+    ]
+    after = max(done, default=None)
+    terms = sorted(terms, key=lambda t: TERM_ORDER[t])
+    return [
+        (year_index, term)
+        for year_index in range(1, min(years, MAX_YEAR_INDEX) + 1)
+        for term in terms
+        if after is None or slot(year_index, term) > after
+    ]
+
+
+def autofill(items, taken_ids, blocks, graph, catalog, cells, unit_caps, budget_ms=DEFAULT_BUDGET_MS, seed=0):
+    """
+    Proposes new plan items for `cells` ([(year_index, term)]).
+
+    `items` are the plan's current items (planning.CHECK_FIELDS), `taken_ids`
+    courses taken outside the plan, `unit_caps` {term: max units}. Returns
+    {"placements": [(year_index, term, course_id)], "unplaced": [course_id],
+    "unmet": [(block, short)], "iterations": n, "timed_out": bool}.
+    `timed_out` means the budget ran out during selection, so the placements
+    only cover the blocks handled before that.
+    """
+    deadline = time.monotonic() + budget_ms / 1000.0
+
+    fixed = first_slots(items, taken_ids)
+
+    selector = _Selector(graph, fixed)
+    unmet = selector.satisfy(blocks, deadline)
+    wanted = selector.chosen
+
+    def units_of(course_id):
+        record = catalog.by_id.get(course_id)
+        units = parse_units(record["units"]) if record else None
+        return DEFAULT_COURSE_UNITS if units is None else units
+
+    units = {course_id: units_of(course_id) for course_id in wanted}
+    cell_index = {cell: i for i, cell in enumerate(cells)}
+    loads = [0.0] * len(cells)
+    occupied = set()
+    for it in items:
+        i = cell_index.get((it["year_index"], it["term"]))
+        if i is None:
+            continue
+        occupied.add((i, it["course_id"]))
+        if it["status"] != PlanItem.Status.DROPPED:
+            loads[i] += units_of(it["course_id"])
+    caps = [unit_caps.get(term, DEFAULT_UNIT_CAP) for _, term in cells]
+    schedule = _Schedule(graph, cells, caps, loads, fixed, units, occupied)
+
+    # Greedy: fill each term with the ready courses, longest dependent chain first.
+    heights = _heights(graph, wanted)
+    pending = sorted(wanted, key=lambda c: (-heights[c], c))
+    for cell, at in enumerate(schedule.slots):
+        ready = [c for c in pending if schedule.ready(c, at)]
+        for course_id in ready:
+            if schedule.fits(cell, course_id):
+                schedule.place(course_id, cell)
+        pending = [c for c in pending if c not in schedule.placed]
+
+    # Local search: random moves / swaps / insertions, keep anything not worse.
+    rng = random.Random(seed)
+    iterations = stale = 0
+    score = schedule.score(pending)
+    while cells and stale < MAX_STALE_ITERATIONS and time.monotonic() < deadline:
+        iterations += 1
+        stale += 1
+        if pending and rng.random() < 0.3:
+            course_id = rng.choice(pending)
+            cell = rng.randrange(len(cells))
+            if schedule.fits(cell, course_id) and schedule.ready(course_id, schedule.slots[cell]):
+                schedule.place(course_id, cell)
+                pending.remove(course_id)
+                score = schedule.score(pending)
+                stale = 0
+            continue
+        if not schedule.placed:
+            break
+
+        course_id = rng.choice(list(schedule.placed))
+        source = schedule.placed[course_id]
+        target = rng.randrange(len(cells))
+        if target == source:
+            continue
+        other = None
+        if not schedule.fits(target, course_id):
+            # Try a swap with a course in the target cell instead.
+            candidates = [c for c, cell in schedule.placed.items() if cell == target]
+            if not candidates:
+                continue
+            other = rng.choice(candidates)
+
+        schedule.unplace(course_id)
+        if other is not None:
+            schedule.unplace(other)
+        ok = schedule.can_move(course_id, source, target) and schedule.fits(target, course_id)
+        if ok:
+            schedule.place(course_id, target)
+            if other is not None:
+                ok = schedule.can_move(other, target, source) and schedule.fits(source, other)
+                if ok:
+                    schedule.place(other, source)
+        new_score = schedule.score(pending) if ok else None
+        if ok and new_score <= score:
+            if new_score < score:
+                stale = 0
+            score = new_score
+            continue
+
+        # Revert.
+        if course_id in schedule.placed:
+            schedule.unplace(course_id)
+        if other is not None and other in schedule.placed:
+            schedule.unplace(other)
+        schedule.place(course_id, source)
+        if other is not None:
+            schedule.place(other, target)
+
+    placements = sorted(
+        ((cells[cell][0], cells[cell][1], course_id) for course_id, cell in schedule.placed.items()),
+        key=lambda p: (slot(p[0], p[1]), p[2]),
+    )
+    return {
+        "placements": placements,
+        "unplaced": sorted(pending),
+        "unmet": unmet,
+        "iterations": iterations,
+        "timed_out": selector.timed_out,
+    }
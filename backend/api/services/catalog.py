@@ -0,0 +1,270 @@
+"""
+In-process snapshot of the course catalog (courses + subject areas, with the
+prerequisite depths from `course_prereq_depths`).
+
+The catalog changes a few times a term, so each worker loads it once and keeps
+serving the same immutable snapshot until the catalog version (row counts and
+latest `updated_at` of both tables, latest depth computation) moves. Version checks and reloads run on a
+background thread; requests never wait on them once the first load is done.
+"""
+import bisect
+import re
+import threading
+import time
+from types import MappingProxyType
+
+from django.db import connection, connections
+from django.db.models import OuterRef, Subquery
+
+from api.models.course import Course
+from api.models.coursePrereqDepth import CoursePrereqDepth
+from api.models.subject import Subject
+
+# Columns and tables the snapshot reads on top of the imported catalog. Every
+# scripts/ job that loads the catalog runs this first, so they work in any
+# order on a fresh database; build_label_index.py, compile_requisites.py and
+# compute_prereq_depths.py then fill them in.
+DEPTH_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CoursePrereqDepth._meta.db_table} (
+    course_id BIGINT PRIMARY KEY,
+    layer INTEGER,
+    chain_length INTEGER,
+    in_cycle BOOLEAN NOT NULL DEFAULT FALSE,
+    computed_at TIMESTAMPTZ NOT NULL
+);
+"""
+CATALOG_SCHEMA_SQL = f"""
+ALTER TABLE {Course._meta.db_table} ADD COLUMN IF NOT EXISTS label_key TEXT;
+ALTER TABLE {Course._meta.db_table} ADD COLUMN IF NOT EXISTS requisites_program JSONB;
+ALTER TABLE {Course._meta.db_table} ADD COLUMN IF NOT EXISTS requisites_compiled_at TIMESTAMPTZ;
+{DEPTH_TABLE_SQL}"""
+
+# How often (seconds) a worker asks the DB whether the catalog has changed.
+VERSION_CHECK_INTERVAL = 30
+
+# Every field a course record exposes to the API (see course_record()).
+COURSE_FIELDS = (
+    "id", "subject_area_id", "subject_code", "number", "title", "description",
+    "units", "requisites_text", "created_at", "updated_at", "requisites_parsed",
+    "prereq_layer", "prereq_chain_length", "prereq_cycle",
+)
+# The light-weight subset used wherever courses are listed as references.
+SUMMARY_FIELDS = ("id", "subject_area_id", "subject_code", "number", "title", "units")
+
+
+def parse_units(units):
+    """Leading number of a `courses.units` string: '4.0' -> 4.0, '1 to 4' -> 1.0, '' -> None."""
+    match = re.match(r"\s*(\d+(?:\.\d+)?)", units or "")
+    return float(match.group(1)) if match else None
+
+
+def normalize_label(label):
+    """'com sci  m151b ' -> 'COM SCI M151B'"""
+    return re.sub(r"\s+", " ", str(label).strip().upper())
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog at one version.
+
+    Course and subject records are read-only mappings shared by every request;
+    views build their response dicts from them and must never hand them out for
+    mutation.
+    """
+
+    def __init__(self, version, courses, subjects):
+        self.version = version
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+        self.subjects = tuple(subjects)
+        self.subject_by_id = MappingProxyType({s["id"]: s for s in self.subjects})
+
+        self.courses = tuple(sorted(courses, key=lambda c: c["id"]))
+        self.course_ids = tuple(c["id"] for c in self.courses)
+        self.by_id = MappingProxyType({c["id"]: c for c in self.courses})
+
+        by_subject = {}
+        by_label = {}
+        for c in self.courses:
+            by_subject.setdefault(c["subject_area_id"], []).append(c)
+            by_label[c["label_key"]] = c
+        self.by_subject = MappingProxyType({k: tuple(v) for k, v in by_subject.items()})
+        self.by_label = MappingProxyType(by_label)
+        self._subject_course_ids = {k: tuple(c["id"] for c in v) for k, v in self.by_subject.items()}
+
+        stamps = [r["updated_at"] for r in self.subjects + self.courses if r["updated_at"]]
+        self._last_modified = max(stamps, default=None)
+        self._subject_last_modified = {}
+        for subject_id, rows in self.by_subject.items():
+            subject = self.subject_by_id.get(subject_id)
+            stamps = [c["updated_at"] for c in rows if c["updated_at"]]
+            if subject is not None and subject["updated_at"]:
+                stamps.append(subject["updated_at"])
+            self._subject_last_modified[subject_id] = max(stamps, default=None)
+
+    def derived(self, key, build):
+        """
+        Structure computed from this snapshot by `build(snapshot)`, built once
+        and kept for as long as the snapshot is current.
+        """
+        value = self._derived.get(key)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = build(self)
+        return value
+
+    def last_modified(self, subject_area_id=None):
+        """Latest `updated_at` behind the whole catalog, or behind one subject's listing."""
+        if subject_area_id:
+            return self._subject_last_modified.get(subject_area_id)
+        return self._last_modified
+
+    def courses_after(self, last_id, subject_area_id=None):
+        """Courses (ordered by id) with id > last_id, optionally within one subject."""
+        if subject_area_id:
+            rows = self.by_subject.get(subject_area_id, ())
+            ids = self._subject_course_ids.get(subject_area_id, ())
+        else:
+            rows, ids = self.courses, self.course_ids
+        if last_id is None:
+            return rows
+        return rows[bisect.bisect_right(ids, last_id):]
+
+
+def ensure_catalog_schema():
+    with connection.cursor() as cursor:
+        cursor.execute(CATALOG_SCHEMA_SQL)
+
+
+def catalog_version():
+    """One cheap round trip that changes whenever a course or subject row, or the depth table, does."""
+    courses, subjects = Course._meta.db_table, Subject._meta.db_table
+    depths = CoursePrereqDepth._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT (SELECT max(updated_at) FROM {courses}), (SELECT count(*) FROM {courses}), "
+            f"(SELECT max(updated_at) FROM {subjects}), (SELECT count(*) FROM {subjects}), "
+            f"(SELECT max(computed_at) FROM {depths})"
+        )
+        return tuple(cursor.fetchone())
+
+
+def course_record(course, subject_code, depth=None):
+    """
+    Read-only mapping of every catalog field of `course`, as shared by the
+    snapshot. `depth` is its CoursePrereqDepth row, if one has been computed.
+    """
+    return MappingProxyType({
+        "id": course.id,
+        "subject_area_id": course.subject_area_id,
+        "subject_code": subject_code,
+        "number": course.number,
+        "title": course.title,
+        "description": course.description,
+        "units": course.units,
+        "requisites_text": course.requisites_text,
+        "created_at": course.created_at,
+        "updated_at": course.updated_at,
+        "requisites_parsed": course.requisites_parsed,
+        "label_key": course.label_key or normalize_label(f"{subject_code} {course.number}"),
+        "requisites_program": (
+            course.requisites_program
+            if course.requisites_compiled_at is not None and course.requisites_compiled_at == course.updated_at
+            else None
+        ),
+        "prereq_layer": depth.layer if depth else None,
+        "prereq_chain_length": depth.chain_length if depth else None,
+        "prereq_cycle": depth.in_cycle if depth else False,
+    })
+
+
+def _load_snapshot(version):
+    subjects = [
+        MappingProxyType({
+            "id": s.id,
+            "code": s.code,
+            "name": s.name,
+            "created_at": s.created_at,
+            "updated_at": s.updated_at,
+        })
+        for s in Subject.objects.all().order_by("id")
+    ]
+    codes = {s["id"]: s["code"] for s in subjects}
+    depths = {d.course_id: d for d in CoursePrereqDepth.objects.all()}
+
+    courses = [
+        course_record(c, codes.get(c.subject_area_id, ""), depths.get(c.id))
+        for c in Course.objects.all().iterator(chunk_size=2000)
+    ]
+    return CatalogSnapshot(version, courses, subjects)
+
+
+def resolve_labels(labels):
+    """
+    Maps each resolvable label to its course record, keyed by normalized label.
+
+    Uses the worker's snapshot when one is already loaded; otherwise resolves
+    all labels with a single query on the indexed `courses.label_key` column
+    (plus one for their prerequisite depths) rather than loading the catalog.
+    """
+    keys = {normalize_label(l) for l in labels if l}
+    if not keys:
+        return {}
+
+    snapshot = _snapshot
+    if snapshot is not None:
+        return {k: snapshot.by_label[k] for k in keys if k in snapshot.by_label}
+
+    subject_code = Subject.objects.filter(id=OuterRef("subject_area_id")).values("code")[:1]
+    courses = list(Course.objects.filter(label_key__in=keys).annotate(subject_code=Subquery(subject_code)))
+    depths = CoursePrereqDepth.objects.in_bulk([c.id for c in courses])
+    return {c.label_key: course_record(c, c.subject_code or "", depths.get(c.id)) for c in courses}
+
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+_refreshing = False
+
+
+def _refresh():
+    global _snapshot, _refreshing
+    try:
+        version = catalog_version()
+        if _snapshot is None or version != _snapshot.version:
+            _snapshot = _load_snapshot(version)
+    except Exception as ex:
+        # Keep serving the old snapshot; the next interval will try again.
+        print(f"Catalog refresh failed: {ex}")
+    finally:
+        _refreshing = False
+        connections.close_all()
+
+
+def get_catalog():
+    """
+    Returns the current CatalogSnapshot.
+
+    The first call in a worker loads synchronously; afterwards a stale snapshot
+    is returned immediately while a background thread checks the version and
+    swaps in a new snapshot if the catalog changed.
+    """
+    global _snapshot, _checked_at, _refreshing
+
+    snapshot = _snapshot
+    if snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _snapshot = _load_snapshot(catalog_version())
+                _checked_at = time.monotonic()
+            return _snapshot
+
+    if time.monotonic() - _checked_at >= VERSION_CHECK_INTERVAL and not _refreshing:
+        with _lock:
+            if not _refreshing:
+                _refreshing = True
+                _checked_at = time.monotonic()
+                threading.Thread(target=_refresh, daemon=True).start()
+    return snapshot
@@ -0,0 +1,6 @@
+import hashlib
+
+
+def make_etag(*parts):
+    """Strong ETag value from anything with a stable repr (versions, paths, ids)."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
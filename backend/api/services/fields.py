@@ -0,0 +1,16 @@
+def parse_fields(raw, allowed, default):
+    """
+    Parses a sparse fieldset such as `?fields=id,number,title`.
+
+    Returns `default` when nothing was requested. `id` is always included so
+    clients can key the rows. Raises ValueError naming any unknown field.
+    """
+    if not raw:
+        return tuple(default)
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    if "id" not in fields:
+        fields = ("id",) + fields
+    return fields
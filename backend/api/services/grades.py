@@ -0,0 +1,192 @@
+"""
+Grade-distribution rollups.
+
+`grade_distributions.grades_json` holds {grade: count} per offering. The
+importer folds those rows into `grade_rollups` (one row per course plus one
+per course and instructor) so grade views read a handful of precomputed rows
+instead of re-aggregating at request time.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models.gradeDistribution import GradeDistribution
+from api.models.gradeRollup import GradeRollup
+
+GRADE_POINTS = {
+    "A+": 4.0, "A": 4.0, "A-": 3.7,
+    "B+": 3.3, "B": 3.0, "B-": 2.7,
+    "C+": 2.3, "C": 2.0, "C-": 1.7,
+    "D+": 1.3, "D": 1.0, "D-": 0.7,
+    "F": 0.0,
+}
+
+ROLLUP_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {GradeRollup._meta.db_table} (
+    id BIGSERIAL PRIMARY KEY,
+    course_id BIGINT NOT NULL,
+    instructor TEXT NOT NULL DEFAULT '',
+    grades_json JSONB NOT NULL,
+    terms JSONB NOT NULL,
+    graded INTEGER NOT NULL,
+    total_enrolled INTEGER NOT NULL,
+    offerings INTEGER NOT NULL,
+    mean_gpa NUMERIC(4, 3),
+    refreshed_at TIMESTAMPTZ NOT NULL,
+    UNIQUE (course_id, instructor)
+);
+"""
+
+# One row per (course, instructor, term, grade). `enrolled` is only counted on
+# the first grade of each offering (ordinality 1), so it sums total_enrolled
+# once per grade_distributions row; `offerings` counts those rows the same way.
+ROLLUP_SQL = f"""
+SELECT gd.course_id,
+       COALESCE(gd.instructor, ''),
+       gd.term,
+       g.key,
+       SUM(CASE WHEN jsonb_typeof(g.value) = 'number' THEN (g.value)::numeric ELSE 0 END),
+       COALESCE(SUM(gd.total_enrolled) FILTER (WHERE g.ord = 1), 0),
+       COUNT(*) FILTER (WHERE g.ord = 1)
+  FROM {GradeDistribution._meta.db_table} gd
+ CROSS JOIN LATERAL jsonb_each(gd.grades_json) WITH ORDINALITY AS g(key, value, ord)
+ WHERE gd.course_id = ANY(%s)
+ GROUP BY gd.course_id, COALESCE(gd.instructor, ''), gd.term, g.key
+ ORDER BY gd.course_id, gd.term
+"""
+
+
+def letter_bucket(grade):
+    """'A-' -> 'A', 'NP' -> 'NP'"""
+    return grade.rstrip("+-") or grade
+
+
+def empty_summary():
+    return {"graded": 0, "enrolled": 0, "offerings": 0, "grade_counts": {}, "terms": {}}
+
+
+def add_to_summary(summary, term, grade, count, enrolled, offerings):
+    count, enrolled = int(count), int(enrolled)
+    summary["graded"] += count
+    summary["enrolled"] += enrolled
+    summary["offerings"] += offerings
+    summary["grade_counts"][grade] = summary["grade_counts"].get(grade, 0) + count
+    term_entry = summary["terms"].setdefault(term, {"term": term, "graded": 0, "enrolled": 0})
+    term_entry["graded"] += count
+    term_entry["enrolled"] += enrolled
+
+
+def mean_gpa(grade_counts):
+    points = weight = 0.0
+    for grade, count in grade_counts.items():
+        if grade in GRADE_POINTS:
+            points += GRADE_POINTS[grade] * count
+            weight += count
+    return round(points / weight, 3) if weight else None
+
+
+def add_shares(summary):
+    """Adds per-grade and per-letter shares of the graded total."""
+    graded = summary["graded"]
+    letter_counts = {}
+    for grade, count in summary["grade_counts"].items():
+        bucket = letter_bucket(grade)
+        letter_counts[bucket] = letter_counts.get(bucket, 0) + count
+    summary["grade_shares"] = {g: round(c / graded, 4) for g, c in summary["grade_counts"].items()} if graded else {}
+    summary["letter_shares"] = {g: round(c / graded, 4) for g, c in letter_counts.items()} if graded else {}
+    return summary
+
+
+def course_ids_for_terms(terms):
+    """Courses with grade rows in any of `terms` (the ones an import touched)."""
+    return set(
+        GradeDistribution.objects.filter(term__in=list(terms), course_id__isnull=False)
+        .values_list("course_id", flat=True).distinct()
+    )
+
+
+def refresh_rollups(course_ids):
+    """
+    Recomputes the rollup rows of `course_ids` from grade_distributions.
+
+    One aggregate query feeds both the course-level and per-instructor rows,
+    which replace the old ones in a single transaction. Returns rows written.
+    """
+    course_ids = sorted({cid for cid in course_ids if cid is not None})
+    if not course_ids:
+        return 0
+
+    summaries = {}
+    with connection.cursor() as cursor:
+        cursor.execute(ROLLUP_SQL, [course_ids])
+        for course_id, instructor, term, grade, count, enrolled, offerings in cursor.fetchall():
+            for key in ((course_id, ""), (course_id, instructor)) if instructor else ((course_id, ""),):
+                summary = summaries.setdefault(key, empty_summary())
+                add_to_summary(summary, term, grade, count, enrolled, offerings)
+
+    now = timezone.now()
+    rollups = [
+        GradeRollup(
+            course_id=course_id,
+            instructor=instructor,
+            grades_json=s["grade_counts"],
+            terms=list(s["terms"].values()),
+            graded=s["graded"],
+            total_enrolled=s["enrolled"],
+            offerings=s["offerings"],
+            mean_gpa=mean_gpa(s["grade_counts"]),
+            refreshed_at=now,
+        )
+        for (course_id, instructor), s in summaries.items()
+    ]
+    with transaction.atomic():
+        GradeRollup.objects.filter(course_id__in=course_ids).delete()
+        GradeRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def serialize_rollup(rollup):
+    summary = {
+        "graded": rollup.graded,
+        "enrolled": rollup.total_enrolled,
+        "offerings": rollup.offerings,
+        "grade_counts": rollup.grades_json,
+        "terms": rollup.terms,
+        "mean_gpa": float(rollup.mean_gpa) if rollup.mean_gpa is not None else None,
+    }
+    if rollup.instructor:
+        summary["instructor"] = rollup.instructor
+    return add_shares(summary)
+
+
+def empty_rollup_summary():
+    summary = empty_summary()
+    summary["terms"] = []
+    summary["mean_gpa"] = None
+    return add_shares(summary)
+
+
+def summarize_courses(course_ids, instructors=False):
+    """
+    {course_id: summary} for every id in `course_ids`, read from grade_rollups.
+
+    With `instructors=True` each summary also lists the per-instructor rollups.
+    """
+    summaries = {}
+    for course_id in course_ids:
+        summaries[course_id] = empty_rollup_summary()
+        if instructors:
+            summaries[course_id]["instructors"] = []
+
+    rollups = GradeRollup.objects.filter(course_id__in=list(summaries))
+    if not instructors:
+        rollups = rollups.filter(instructor="")
+    # The course-level row ("" instructor) sorts ahead of its instructor rows.
+    for rollup in rollups.order_by("course_id", "instructor"):
+        if not rollup.instructor:
+            summary = serialize_rollup(rollup)
+            if instructors:
+                summary["instructors"] = []
+            summaries[rollup.course_id] = summary
+        else:
+            summaries[rollup.course_id]["instructors"].append(serialize_rollup(rollup))
+    return summaries
@@ -0,0 +1,172 @@
+"""
+Fractional ordering keys for plan items within a (year_index, term) cell.
+
+`plan_items.sort_key` is a base-62 string read as a fraction (0.<digits>), so
+there is always a key strictly between two others and an insert or move
+rewrites only the row that moves. The column uses the "C" collation, so the
+database compares keys bytewise, the same way Python does, and
+idx_plan_cell (plan_id, year_index, term, sort_key) serves ordered cell reads.
+
+Keys grow by about one digit per repeated insert into the same gap. Once a
+key passes REBALANCE_KEY_LENGTH the cell is rewritten with evenly spread,
+short keys on a background thread. A key that would pass
+MAX_INLINE_KEY_LENGTH, well inside the column's width, is never written:
+placement_key() rebalances the cell first, and batch writers respread the
+cell in memory (spread_keys) before saving.
+"""
+import threading
+
+from django.db import connections, transaction
+
+from api.models.plan import PlanItem
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Keys longer than this trigger a background rebalance of their cell.
+REBALANCE_KEY_LENGTH = 24
+# Keys longer than this make the writer rebalance the cell before saving
+# (plan_items.sort_key is varchar(64)).
+MAX_INLINE_KEY_LENGTH = 48
+
+
+def _midpoint(a, b):
+    """Digits strictly between fractions a and b (b None = 1); neither ends in '0'."""
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    da = DIGITS.index(a[0]) if a else 0
+    db = DIGITS.index(b[0]) if b else BASE
+    if db - da > 1:
+        return DIGITS[(da + db) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[da] + _midpoint(a[1:], None)
+
+
+def key_between(a, b):
+    """
+    A key that sorts strictly after `a` and before `b` (None = open end).
+
+    key_between(None, None) -> "V"; key_between("V", None) -> "k";
+    key_between("V", "W") -> "VV".
+    """
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} must sort before {b!r}")
+    return _midpoint(a or "", b)
+
+
+def keys_after(a, n):
+    """n increasing keys after `a` (None = from the start)."""
+    keys = []
+    for _ in range(n):
+        a = key_between(a, None)
+        keys.append(a)
+    return keys
+
+
+def spread_keys(n):
+    """n short, evenly spaced increasing keys, for backfills and rebalancing."""
+    width = 1
+    while BASE ** width <= n:
+        width += 1
+    keys = []
+    for i in range(1, n + 1):
+        value = i * BASE ** width // (n + 1)
+        digits = []
+        for _ in range(width):
+            value, d = divmod(value, BASE)
+            digits.append(DIGITS[d])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def placement_key(plan_id, year_index, term, after_id=None, before_id=None, exclude_id=None):
+    """
+    Key for an item placed in a cell right after item `after_id` and/or right
+    before item `before_id` (the other neighbour is looked up), or at the end
+    of the cell when neither is given. `exclude_id` is the item being moved.
+    Raises ValueError if a neighbour is not in that cell.
+
+    If the key would pass MAX_INLINE_KEY_LENGTH the cell is rebalanced
+    synchronously first.
+    """
+    key = _placement_key(plan_id, year_index, term, after_id, before_id, exclude_id)
+    if len(key) > MAX_INLINE_KEY_LENGTH:
+        rebalance_cell(plan_id, year_index, term)
+        key = _placement_key(plan_id, year_index, term, after_id, before_id, exclude_id)
+    return key
+
+
+def _placement_key(plan_id, year_index, term, after_id, before_id, exclude_id):
+    cell = PlanItem.objects.filter(plan_id=plan_id, year_index=year_index, term=term)
+    if exclude_id is not None:
+        cell = cell.exclude(id=exclude_id)
+    if after_id is None and before_id is None:
+        return key_between(cell.filter(sort_key__isnull=False).order_by("-sort_key")
+                           .values_list("sort_key", flat=True).first(), None)
+
+    neighbours = dict(cell.filter(id__in=[i for i in (after_id, before_id) if i is not None])
+                      .values_list("id", "sort_key"))
+    for item_id in (after_id, before_id):
+        if item_id is not None and not neighbours.get(item_id):
+            raise ValueError(f"item {item_id} is not in this cell")
+    a, b = neighbours.get(after_id), neighbours.get(before_id)
+    if b is None:
+        b = cell.filter(sort_key__gt=a).order_by("sort_key").values_list("sort_key", flat=True).first()
+    elif a is None:
+        a = cell.filter(sort_key__lt=b).order_by("-sort_key").values_list("sort_key", flat=True).first()
+    return key_between(a, b)
+
+
+def cell_key(keys_by_id, after_id=None, before_id=None):
+    """
+    placement_key() for a cell already in memory: `keys_by_id` maps the ids
+    of the cell's other items to their keys.
+    """
+    keys = sorted(k for k in keys_by_id.values() if k)
+    if after_id is None and before_id is None:
+        return key_between(keys[-1] if keys else None, None)
+    for item_id in (after_id, before_id):
+        if item_id is not None and not keys_by_id.get(item_id):
+            raise ValueError(f"item {item_id} is not in this cell")
+    a, b = keys_by_id.get(after_id), keys_by_id.get(before_id)
+    if b is None:
+        b = next((k for k in keys if k > a), None)
+    elif a is None:
+        a = next((k for k in reversed(keys) if k < b), None)
+    return key_between(a, b)
+
+
+def rebalance_cell(plan_id, year_index, term):
+    """Rewrites a cell's keys evenly, keeping the current order."""
+    with transaction.atomic():
+        items = list(
+            PlanItem.objects.select_for_update()
+            .filter(plan_id=plan_id, year_index=year_index, term=term)
+            .order_by("sort_key", "position", "id")
+        )
+        for item, key in zip(items, spread_keys(len(items))):
+            item.sort_key = key
+        PlanItem.objects.bulk_update(items, ["sort_key"])
+
+
+def _rebalance_in_background(plan_id, year_index, term):
+    try:
+        rebalance_cell(plan_id, year_index, term)
+    except Exception as ex:
+        # Long keys still order correctly; the next long key retries.
+        print(f"Rebalancing plan {plan_id} cell ({year_index}, {term}) failed: {ex}")
+    finally:
+        connections.close_all()
+
+
+def maybe_rebalance(plan_id, year_index, term, key):
+    """Schedules a background rebalance of the cell if `key` has grown too long."""
+    if key is not None and len(key) > REBALANCE_KEY_LENGTH:
+        threading.Thread(
+            target=_rebalance_in_background, args=(plan_id, year_index, term), daemon=True,
+        ).start()
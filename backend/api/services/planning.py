@@ -0,0 +1,167 @@
+"""
+Plan-level checks against the prerequisite graph.
+
+A plan is a grid of (year_index, term) cells. Cells are totally ordered by
+`slot()`; a planned course's requisites must be met by courses placed in
+strictly earlier cells. Dropped items neither count nor get checked.
+"""
+from api.models.plan import PlanItem
+from api.services.catalog import normalize_label, resolve_labels
+from api.services.prereqs import missing_courses
+
+# Order of the terms within one academic year.
+TERM_ORDER = {
+    PlanItem.Term.FALL: 1,
+    PlanItem.Term.WINTER: 2,
+    PlanItem.Term.SPRING: 3,
+    PlanItem.Term.SUMMER_A: 4,
+    PlanItem.Term.SUMMER_C: 5,
+}
+
+# DB check constraint on plan_items.year_index.
+MAX_YEAR_INDEX = 5
+
+# Item fields the checks need; fetch them with .values(*CHECK_FIELDS).
+CHECK_FIELDS = ("id", "year_index", "term", "course_id", "status")
+
+# Slot of classes taken before the plan (earlier than any cell).
+TAKEN_SLOT = -1
+
+
+def slot(year_index, term):
+    """Sortable position of a plan cell: (1, "WINTER") -> 12."""
+    return year_index * 10 + TERM_ORDER.get(term, 0)
+
+
+def first_slots(items, taken_ids=()):
+    """
+    {course_id: earliest slot it is placed in} over the items that count;
+    courses in `taken_ids` (classes_taken) are at TAKEN_SLOT.
+    """
+    earliest = dict.fromkeys(taken_ids, TAKEN_SLOT)
+    for it in items:
+        if it["status"] == PlanItem.Status.DROPPED:
+            continue
+        s = slot(it["year_index"], it["term"])
+        if s < earliest.get(it["course_id"], s + 1):
+            earliest[it["course_id"]] = s
+    return earliest
+
+
+def item_violation(item, graph, earliest):
+    """
+    The violation of one item given `earliest` (see first_slots), or None.
+
+    `missing` lists the prerequisites neither taken nor placed before the
+    item; `later` is the subset of them that the plan does contain, but in
+    the same or a later term.
+    """
+    if item["status"] == PlanItem.Status.DROPPED:
+        return None
+    program = graph.program(item["course_id"])
+    if not program:
+        return None
+    here = slot(item["year_index"], item["term"])
+    missing = missing_courses(program, lambda course_id: earliest.get(course_id, here) < here)
+    if not missing:
+        return None
+    return {
+        "item_id": item["id"],
+        "course_id": item["course_id"],
+        "year_index": item["year_index"],
+        "term": item["term"],
+        "missing": missing,
+        "later": [course_id for course_id in missing if course_id in earliest],
+    }
+
+
+def plan_violations(items, graph, taken_ids=()):
+    """
+    Every item whose requisites are not met by earlier cells or by
+    `taken_ids` (classes_taken), in plan order.
+
+    One pass to find where each course first appears, then one evaluation of
+    each item's compiled program: O(items + requisite edges), plus sorting
+    the result into plan order.
+    """
+    earliest = first_slots(items, taken_ids)
+    violations = []
+    for it in sorted(items, key=lambda it: (slot(it["year_index"], it["term"]), it["id"])):
+        violation = item_violation(it, graph, earliest)
+        if violation is not None:
+            violations.append(violation)
+    return violations
+
+
+def violation_changes(before, after, course_id, graph, taken_ids=()):
+    """
+    Violations created and resolved by changing the placement of items of
+    `course_id`, from item list `before` to `after` (with `taken_ids` as in
+    plan_violations).
+
+    Only the course itself and its direct dependents (from the reverse
+    prerequisite index) can change state, so only their items are
+    re-evaluated. Returns {"created": [...], "resolved": [...]}; "resolved"
+    holds the violations as they were before the change.
+    """
+    affected = {course_id, *graph.dependents(course_id)}
+
+    def violations(items):
+        earliest = first_slots(items, taken_ids)
+        found = {}
+        for it in items:
+            if it["course_id"] in affected:
+                violation = item_violation(it, graph, earliest)
+                if violation is not None:
+                    found[it["id"]] = violation
+        return found
+
+    old, new = violations(before), violations(after)
+    return {
+        "created": [v for item_id, v in new.items() if item_id not in old],
+        "resolved": [v for item_id, v in old.items() if item_id not in new],
+    }
+
+
+def taken_course_ids(classes_taken):
+    """Catalog ids of the courses in a profile's classes_taken ([{"quarter", "course"}])."""
+    labels = [c.get("course") for c in classes_taken or () if isinstance(c, dict)]
+    return {record["id"] for record in resolve_labels(labels).values()}
+
+
+def requirement_blocks(classes_needed, catalog):
+    """
+    Normalizes a profile's `classes_needed` (DARS blocks of {"needs",
+    "options", "needs_text"}) against the catalog.
+
+    Each option is a label or a list of interchangeable labels; it becomes a
+    tuple of course ids (unknown labels dropped, options with none left
+    skipped). A block without a parsed `needs` count requires all of its
+    options. Returns [{"index", "needs", "needs_text", "options"}].
+    """
+    blocks = []
+    for index, req in enumerate(classes_needed or ()):
+        if not isinstance(req, dict):
+            continue
+        options = []
+        for option in req.get("options") or ():
+            labels = option if isinstance(option, (list, tuple)) else (option,)
+            ids = tuple(dict.fromkeys(
+                catalog.by_label[key]["id"]
+                for key in (normalize_label(label) for label in labels if label)
+                if key in catalog.by_label
+            ))
+            if ids:
+                options.append(ids)
+        if not options:
+            continue
+        needs = req.get("needs")
+        if not isinstance(needs, int) or needs <= 0:
+            needs = len(options)
+        blocks.append({
+            "index": index,
+            "needs": min(needs, len(options)),
+            "needs_text": req.get("needs_text"),
+            "options": options,
+        })
+    return blocks
@@ -0,0 +1,524 @@
+"""
+Prerequisite graph compiled from `courses.requisites_parsed`.
+
+Two shapes of requisite JSON exist in the catalog:
+
+* id trees: {"all_of": [...]}, {"any_of": [...]}, {"course": <id>} and lists
+  (lists mean all_of);
+* registrar groups: {"requisites": [{"type": "enforced", "groups": [
+  {"operator": "AND" | "OR", "courses": [{"subject", "number"}]}]}]}, where
+  subject may be a code ("COM SCI") or a name ("Computer Science").
+
+Only enforced registrar requisites count. Each tree is compiled to a flat
+postfix program over course ids (see compile_requisites), references that do
+not resolve to a catalog course are dropped. Programs are stored next to the
+JSON in `courses.requisites_program` (scripts/compile_requisites.py) and, for
+rows whose stored program is missing or stale, compiled once per worker and
+kept until the course's `updated_at` moves.
+
+The graph is built once per catalog snapshot into CSR arrays: course i's
+prerequisites are targets[offsets[i]:offsets[i + 1]], as dense indices into
+`ids`. The reverse
+("what does this unlock") adjacency is kept the same way in rev_offsets /
+rev_targets.
+
+Per-course scheduling depth (PrereqGraph.depths) is computed by a batch job
+(scripts/compute_prereq_depths.py) into `course_prereq_depths` and served
+with the catalog records.
+"""
+import heapq
+from array import array
+from collections import deque
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models.coursePrereqDepth import CoursePrereqDepth
+from api.services.catalog import get_catalog, normalize_label
+
+
+AND, OR = 0, 1
+
+
+def op_code(kind, n):
+    """Operator entry combining the top `n` stack values; always <= -2."""
+    return -((n << 1) | kind)
+
+
+def decode_op(op):
+    """-> (kind, n)"""
+    return (-op) & 1, (-op) >> 1
+
+
+def _close(kind, n, out):
+    if n == 0:
+        return False
+    if n > 1:
+        out.append(op_code(kind, n))
+    return True
+
+
+def _emit_group(kind, items, resolve, out):
+    n = 0
+    for item in items:
+        n += _emit(item, resolve, out)
+    return _close(kind, n, out)
+
+
+def _emit(tree, resolve, out):
+    if isinstance(tree, list):
+        return _emit_group(AND, tree, resolve, out)
+    if not isinstance(tree, dict):
+        return False
+
+    parts = 0
+    if "course" in tree:
+        course_id = resolve(tree["course"])
+        if course_id is not None:
+            out.append(course_id)
+            parts += 1
+    if isinstance(tree.get("all_of"), list):
+        parts += _emit_group(AND, tree["all_of"], resolve, out)
+    if isinstance(tree.get("any_of"), list):
+        parts += _emit_group(OR, tree["any_of"], resolve, out)
+
+    for req in tree.get("requisites") or ():
+        if not isinstance(req, dict) or req.get("type") != "enforced":
+            continue
+        for group in req.get("groups") or ():
+            if not isinstance(group, dict):
+                continue
+            kind = OR if str(group.get("operator", "")).upper() == "OR" else AND
+            n = 0
+            for course in group.get("courses") or ():
+                course_id = resolve((course.get("subject") or "", course.get("number") or ""))
+                if course_id is not None:
+                    out.append(course_id)
+                    n += 1
+            parts += _close(kind, n, out)
+
+    return _close(AND, parts, out)
+
+
+def compile_requisites(tree, resolve):
+    """
+    Compiles a requisite tree into a postfix program: a flat list of ints where
+    a positive value pushes "course <id> is taken" and op_code(AND|OR, n) pops
+    n values and pushes their conjunction / disjunction. [] means no
+    requirement.
+
+    {"all_of": [{"course": 1}, {"any_of": [{"course": 2}, {"course": 3}]}]}
+    -> [1, 2, 3, op_code(OR, 2), op_code(AND, 2)]
+    """
+    program = []
+    _emit(tree, resolve, program)
+    return program
+
+
+def evaluate(program, is_taken):
+    """Runs a program; `is_taken(leaf)` answers for each pushed operand."""
+    stack = []
+    for op in program:
+        if op >= 0:
+            stack.append(is_taken(op))
+            continue
+        kind, n = decode_op(op)
+        values = stack[-n:]
+        del stack[-n:]
+        stack.append(any(values) if kind == OR else all(values))
+    return stack[-1] if stack else True
+
+
+def missing_courses(program, is_taken):
+    """
+    Course ids that would have to be taken for `program` to pass, given
+    `is_taken`: every missing part of an AND, every alternative of an OR that
+    has none satisfied. Empty when the program already passes.
+    """
+    stack = []
+    for op in program:
+        if op >= 0:
+            stack.append((True, ()) if is_taken(op) else (False, (op,)))
+            continue
+        kind, n = decode_op(op)
+        children = stack[-n:]
+        del stack[-n:]
+        if kind == OR and any(ok for ok, _ in children):
+            stack.append((True, ()))
+            continue
+        missing = tuple(leaf for ok, leaves in children if not ok for leaf in leaves)
+        stack.append((not missing, missing))
+    if not stack or stack[-1][0]:
+        return []
+    return list(dict.fromkeys(stack[-1][1]))
+
+
+def to_clauses(program):
+    """
+    Bitmask clauses for programs that are an AND of ORs of leaves (the common
+    case): satisfied iff every mask shares a bit with the taken bitset. Leaves
+    must already be dense indices. Returns None for any other shape.
+    """
+    stack = []
+    for op in program:
+        if op >= 0:
+            stack.append([1 << op])
+            continue
+        kind, n = decode_op(op)
+        children = stack[-n:]
+        del stack[-n:]
+        if kind == AND:
+            stack.append([clause for child in children for clause in child])
+        elif all(len(child) == 1 for child in children):
+            mask = 0
+            for child in children:
+                mask |= child[0]
+            stack.append([mask])
+        else:
+            return None
+    return stack[-1] if stack else []
+
+
+class RefResolver:
+    """Maps requisite references onto course ids of one snapshot."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.codes = {}
+        for s in snapshot.subjects:
+            self.codes[normalize_label(s["code"])] = s["code"]
+            self.codes[normalize_label(s["name"])] = s["code"]
+
+    def __call__(self, ref):
+        if isinstance(ref, tuple):
+            subject, number = ref
+            code = self.codes.get(normalize_label(subject), subject)
+            record = self.snapshot.by_label.get(normalize_label(f"{code} {number}"))
+            return record["id"] if record else None
+        try:
+            course_id = int(ref)
+        except (TypeError, ValueError):
+            return None
+        return course_id if course_id in self.snapshot.by_id else None
+
+
+# course_id -> (updated_at, program) for courses compiled in this worker
+_compiled = {}
+
+
+def course_program(record, resolve, known_ids):
+    """
+    The compiled program of a snapshot course record: the stored one when it
+    is current and only names catalog courses, else a cached or fresh compile.
+    """
+    program = record["requisites_program"]
+    if program is not None and all(op < 0 or op in known_ids for op in program):
+        return program
+    cached = _compiled.get(record["id"])
+    if cached is not None and cached[0] == record["updated_at"]:
+        return cached[1]
+    program = compile_requisites(record["requisites_parsed"], resolve)
+    _compiled[record["id"]] = (record["updated_at"], program)
+    return program
+
+
+class PrereqGraph:
+    def __init__(self, snapshot):
+        self.resolve = resolve = RefResolver(snapshot)
+        self.ids = array("q", snapshot.course_ids)
+        self.index = {course_id: i for i, course_id in enumerate(self.ids)}
+
+        self.programs = []   # per dense index, over course ids
+        self._clauses = []   # bitmask clauses, or None -> evaluate _dense_programs
+        self._dense_programs = []
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        for record in snapshot.courses:
+            program = course_program(record, resolve, self.index)
+            dense = [self.index[op] if op >= 0 else op for op in program]
+            self.programs.append(program)
+            self._dense_programs.append(dense)
+            self._clauses.append(to_clauses(dense))
+
+            prereqs = {op for op in dense if op >= 0 and op != self.index[record["id"]]}
+            self.targets.extend(sorted(prereqs))
+            self.offsets.append(len(self.targets))
+        self._build_reverse()
+        self._cycles = None   # (layers, {index: cycle component}), built on first use
+
+    def _build_reverse(self):
+        """Transposes the CSR arrays with a counting pass: dependents of j in rev_targets."""
+        n = len(self.ids)
+        counts = [0] * (n + 1)
+        for j in self.targets:
+            counts[j + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.rev_offsets = array("l", counts)
+        self.rev_targets = array("l", bytes(len(self.targets) * self.targets.itemsize))
+        fill = counts[:n]
+        for i in range(n):
+            for j in self.targets[self.offsets[i]:self.offsets[i + 1]]:
+                self.rev_targets[fill[j]] = i
+                fill[j] += 1
+
+    def _prereq_indices(self, i):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def _dependent_indices(self, i):
+        return self.rev_targets[self.rev_offsets[i]:self.rev_offsets[i + 1]]
+
+    def program(self, course_id):
+        """Compiled requisite program of `course_id` (over course ids)."""
+        i = self.index.get(course_id)
+        return self.programs[i] if i is not None else []
+
+    def prereqs(self, course_id):
+        """Direct prerequisite ids of `course_id`."""
+        i = self.index.get(course_id)
+        if i is None:
+            return []
+        return [self.ids[j] for j in self._prereq_indices(i)]
+
+    def dependents(self, course_id):
+        """Ids of courses that list `course_id` as a direct prerequisite."""
+        i = self.index.get(course_id)
+        if i is None:
+            return []
+        return [self.ids[j] for j in self._dependent_indices(i)]
+
+    def _walk(self, course_id, neighbors, max_depth):
+        root = self.index.get(course_id)
+        if root is None:
+            return {}, False
+        depths = {root: 0}
+        truncated = False
+        queue = deque([root])
+        while queue:
+            i = queue.popleft()
+            children = neighbors(i)
+            if max_depth is not None and depths[i] >= max_depth:
+                truncated = truncated or any(j not in depths for j in children)
+                continue
+            for j in children:
+                if j not in depths:
+                    depths[j] = depths[i] + 1
+                    queue.append(j)
+        return {self.ids[i]: d for i, d in depths.items()}, truncated
+
+    def closure(self, course_id, max_depth=None):
+        """
+        Breadth-first walk down the prerequisite chain of `course_id`.
+
+        Returns ({course_id: depth}, truncated): depth is the shortest number of
+        hops from the root (the root itself is 0). `truncated` is True when
+        max_depth stopped the walk before the chain ran out.
+        """
+        return self._walk(course_id, self._prereq_indices, max_depth)
+
+    def unlocks(self, course_id, max_depth=None):
+        """Same as closure(), walking up to the courses `course_id` leads to."""
+        return self._walk(course_id, self._dependent_indices, max_depth)
+
+
+    def _layer_of(self, i, layers):
+        """Earliest layer of course i given `layers` of its prerequisites (None = unreachable)."""
+        stack = []
+        for op in self._dense_programs[i]:
+            if op >= 0:
+                stack.append(None if layers[op] is None else layers[op] + 1)
+                continue
+            kind, n = decode_op(op)
+            values = stack[-n:]
+            del stack[-n:]
+            if kind == OR:
+                known = [v for v in values if v is not None]
+                stack.append(min(known) if known else None)
+            else:
+                stack.append(None if None in values else max(values))
+        return stack[-1] if stack else 0
+
+    def _layers(self):
+        """
+        Earliest term index of every course (0 = no prerequisites): AND takes
+        the latest of its parts, OR the earliest, each prerequisite adds one.
+
+        Courses are settled in increasing layer order from a heap, re-evaluating
+        a dependent whenever one of its prerequisites settles, so alternatives
+        that route around a cycle still get a layer. None = never satisfiable.
+        """
+        n = len(self.ids)
+        settled = [None] * n
+        heap = [(0, i) for i in range(n) if not self._dense_programs[i]]
+        heapq.heapify(heap)
+        while heap:
+            layer, i = heapq.heappop(heap)
+            if settled[i] is not None:
+                continue
+            settled[i] = layer
+            for j in self._dependent_indices(i):
+                if settled[j] is None:
+                    candidate = self._layer_of(j, settled)
+                    if candidate is not None:
+                        heapq.heappush(heap, (candidate, j))
+        return settled
+
+    def _chain_lengths(self):
+        """
+        Longest chain of prerequisite hops below each course (every named
+        prerequisite counts, whatever the operator), by Kahn's algorithm over
+        the CSR arrays. Courses on or behind a cycle are left as None.
+        """
+        n = len(self.ids)
+        remaining = [self.offsets[i + 1] - self.offsets[i] for i in range(n)]
+        chain = [None] * n
+        queue = deque(i for i in range(n) if not remaining[i])
+        while queue:
+            i = queue.popleft()
+            prereqs = self._prereq_indices(i)
+            chain[i] = 1 + max(chain[j] for j in prereqs) if prereqs else 0
+            for j in self._dependent_indices(i):
+                remaining[j] -= 1
+                if not remaining[j]:
+                    queue.append(j)
+        return chain
+
+    def _cycle_members(self, candidates):
+        """
+        Dense indices (among `candidates`) that lie on a prerequisite cycle,
+        via iterative Tarjan SCC: {index: component number}.
+        """
+        index, low, on_stack = {}, {}, set()
+        stack, members = [], {}
+        counter = 0
+        for root in candidates:
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                i, pos = work.pop()
+                if pos == 0:
+                    index[i] = low[i] = counter
+                    counter += 1
+                    stack.append(i)
+                    on_stack.add(i)
+                prereqs = self._prereq_indices(i)
+                for k in range(pos, len(prereqs)):
+                    j = prereqs[k]
+                    if j not in candidates:
+                        continue
+                    if j not in index:
+                        work.append((i, k + 1))
+                        work.append((j, 0))
+                        break
+                    if j in on_stack:
+                        low[i] = min(low[i], index[j])
+                else:
+                    if low[i] == index[i]:
+                        component = []
+                        while True:
+                            j = stack.pop()
+                            on_stack.discard(j)
+                            component.append(j)
+                            if j == i:
+                                break
+                        if len(component) > 1:
+                            members.update(dict.fromkeys(component, len(members)))
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[i])
+        return members
+
+    def depths(self):
+        """
+        Scheduling depth of every course: [(course_id, layer, chain_length,
+        in_cycle)] in id order.
+
+        `layer` is the earliest term (0-based) the course can be taken in if
+        every prerequisite is taken as early as possible, `chain_length` the
+        longest prerequisite chain under it; either is None when a cycle makes
+        it undefined. `in_cycle` marks the courses that form a cycle.
+        """
+        layers = self._layers()
+        chain = self._chain_lengths()
+        cyclic = self._cycle_members({i for i, length in enumerate(chain) if length is None})
+        return [
+            (self.ids[i], layers[i], chain[i], i in cyclic)
+            for i in range(len(self.ids))
+        ]
+
+    def _cycle_data(self):
+        if self._cycles is None:
+            chain = self._chain_lengths()
+            cyclic = self._cycle_members({i for i, length in enumerate(chain) if length is None})
+            self._cycles = (self._layers(), cyclic)
+        return self._cycles
+
+    def breaks_cycle(self, course_id, prereq_id):
+        """
+        Whether walks that recurse into prerequisites should skip the edge
+        course_id -> prereq_id: both lie in the same cycle and the prerequisite
+        is not in an earlier layer. The other edges form a DAG that still
+        satisfies every course that has a layer. A self-reference always
+        breaks.
+        """
+        if course_id == prereq_id:
+            return True
+        i, j = self.index.get(course_id), self.index.get(prereq_id)
+        if i is None or j is None:
+            return False
+        layers, component = self._cycle_data()
+        if i not in component or component.get(j) != component[i]:
+            return False
+        return layers[j] is None or layers[i] is None or layers[j] >= layers[i]
+
+    def taken_bits(self, course_ids):
+        bits = 0
+        for course_id in course_ids:
+            i = self.index.get(course_id)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def eligible(self, taken_ids, include_open=False):
+        """
+        Ids of every course (not already taken) whose requisites `taken_ids`
+        satisfy, in one pass over the catalog. Courses without requisites are
+        only included with `include_open`.
+        """
+        bits = self.taken_bits(taken_ids)
+        result = []
+        for i, clauses in enumerate(self._clauses):
+            if bits >> i & 1:
+                continue
+            program = self._dense_programs[i]
+            if not program:
+                if include_open:
+                    result.append(self.ids[i])
+                continue
+            if clauses is not None:
+                ok = all(mask & bits for mask in clauses)
+            else:
+                ok = evaluate(program, lambda j: bits >> j & 1)
+            if ok:
+                result.append(self.ids[i])
+        return result
+
+
+def get_prereq_graph(snapshot=None):
+    """The PrereqGraph of `snapshot` (default: the current catalog), built once per snapshot."""
+    return (snapshot or get_catalog()).derived("prereq_graph", PrereqGraph)
+
+
+def store_depths(graph):
+    """Replaces `course_prereq_depths` with graph.depths(); returns the rows written."""
+    now = timezone.now()
+    rows = [
+        CoursePrereqDepth(course_id=course_id, layer=layer, chain_length=chain_length,
+                          in_cycle=in_cycle, computed_at=now)
+        for course_id, layer, chain_length, in_cycle in graph.depths()
+    ]
+    with transaction.atomic():
+        CoursePrereqDepth.objects.all().delete()
+        CoursePrereqDepth.objects.bulk_create(rows, batch_size=1000)
+    return rows
@@ -0,0 +1,181 @@
+"""
+Assignment of plan courses to degree-requirement blocks.
+
+Each block of `classes_needed` (see planning.requirement_blocks) asks for
+`needs` of its options. The courses the student has (plan items that are not
+dropped, plus classes_taken) are matched to blocks as a maximum flow:
+source -> course (capacity 1) -> (block, option) (1) -> block (needs) -> sink.
+So every course counts toward at most one block, each option (a set of
+interchangeable labels) at most once per block, and as many requirements as
+possible are filled whatever the order of the blocks.
+
+Results are kept per plan in a small in-process LRU keyed by a version hash
+of everything they depend on, so re-reading an unchanged plan skips the
+matching.
+"""
+import threading
+from collections import OrderedDict, deque
+
+from api.models.plan import PlanItem
+from api.services.conditional import make_etag
+from api.services.planning import requirement_blocks, taken_course_ids
+
+# Plans whose last matching is kept per worker.
+CACHE_SIZE = 1024
+
+def max_flow(n, edges, source, sink):
+    """
+    Maximum flow (Dinic) over vertices 0..n-1. `edges` is [(u, v, capacity)];
+    returns the flow on each edge, in the same order.
+    """
+    adjacency = [[] for _ in range(n)]
+    to, cap = [], []
+    for u, v, capacity in edges:
+        # Edge e and its residual twin e ^ 1.
+        adjacency[u].append(len(to))
+        to.append(v)
+        cap.append(capacity)
+        adjacency[v].append(len(to))
+        to.append(u)
+        cap.append(0)
+
+    while True:
+        level = [-1] * n
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in adjacency[u]:
+                if cap[e] > 0 and level[to[e]] < 0:
+                    level[to[e]] = level[u] + 1
+                    queue.append(to[e])
+        if level[sink] < 0:
+            break
+
+        # Blocking flow: iterative DFS along the levels, retreating from dead ends.
+        pointer = [0] * n
+        while True:
+            u, path = source, []
+            while u != sink:
+                out = adjacency[u]
+                while pointer[u] < len(out):
+                    e = out[pointer[u]]
+                    if cap[e] > 0 and level[to[e]] == level[u] + 1:
+                        break
+                    pointer[u] += 1
+                if pointer[u] < len(out):
+                    path.append(e)
+                    u = to[e]
+                    continue
+                if not path:
+                    break
+                level[u] = -1
+                u = to[path.pop() ^ 1]
+                pointer[u] += 1
+            if u != sink:
+                break
+            push = min(cap[e] for e in path)
+            for e in path:
+                cap[e] -= push
+                cap[e ^ 1] += push
+
+    return [cap[2 * k + 1] for k in range(len(edges))]
+
+
+def match_requirements(blocks, had):
+    """
+    Assigns courses to blocks.
+
+    `had` maps course_id -> where it comes from (a plan item id, or None for
+    classes_taken). Returns (per-block results, unassigned course ids).
+    """
+    courses = sorted(c for c in had if any(c in option for block in blocks for option in block["options"]))
+
+    # source -> course (1) -> (block, option) (1) -> block (1) -> sink (needs)
+    source, sink = 0, 1
+    course_node = {course_id: 2 + i for i, course_id in enumerate(courses)}
+    n = 2 + len(courses)
+    edges, course_edges = [], []    # course_edges: (edge index, block, option, course_id)
+    for b, block in enumerate(blocks):
+        block_node = n
+        n += 1
+        edges.append((block_node, sink, block["needs"]))
+        for k, option in enumerate(block["options"]):
+            option_node = n
+            n += 1
+            edges.append((option_node, block_node, 1))
+            for course_id in option:
+                if course_id in course_node:
+                    course_edges.append((len(edges), b, k, course_id))
+                    edges.append((course_node[course_id], option_node, 1))
+    for course_id in courses:
+        edges.append((source, course_node[course_id], 1))
+    flow = max_flow(n, edges, source, sink)
+
+    assigned = [[] for _ in blocks]
+    taken_options = [set() for _ in blocks]
+    used = set()
+    for e, b, k, course_id in course_edges:
+        if flow[e]:
+            assigned[b].append(course_id)
+            taken_options[b].add(k)
+            used.add(course_id)
+
+    results = []
+    for b, block in enumerate(blocks):
+        results.append({
+            "requirement": block["index"],
+            "needs": block["needs"],
+            "needs_text": block["needs_text"],
+            "satisfied_by": [
+                {"course_id": course_id, "item_id": had[course_id]}
+                for course_id in sorted(assigned[b])
+            ],
+            "remaining": block["needs"] - len(assigned[b]),
+            "open_options": [
+                list(option) for k, option in enumerate(block["options"]) if k not in taken_options[b]
+            ],
+        })
+    unassigned = sorted(c for c in had if c not in used and had[c] is not None)
+    return results, unassigned
+
+
+def courses_had(items, taken_ids):
+    """{course_id: item id or None} for the plan's live items and classes_taken."""
+    had = {course_id: None for course_id in taken_ids}
+    for it in sorted(items, key=lambda it: it["id"]):
+        if it["status"] != PlanItem.Status.DROPPED:
+            had.setdefault(it["course_id"], it["id"])
+    return had
+
+
+_cache = OrderedDict()    # plan_id -> (version, result)
+_cache_lock = threading.Lock()
+
+
+def plan_requirements(plan_id, items, classes_taken, classes_needed, catalog):
+    """
+    match_requirements() for one plan, reusing the last result while the
+    plan's items, the profile's requirement JSON and the catalog are
+    unchanged. Returns {"requirements": [...], "unassigned": [...]}.
+    """
+    version = make_etag(
+        sorted((it["id"], it["course_id"], it["status"]) for it in items),
+        classes_taken, classes_needed, catalog.version,
+    )
+    with _cache_lock:
+        cached = _cache.get(plan_id)
+        if cached is not None and cached[0] == version:
+            _cache.move_to_end(plan_id)
+            return cached[1]
+
+    blocks = requirement_blocks(classes_needed, catalog)
+    results, unassigned = match_requirements(blocks, courses_had(items, taken_course_ids(classes_taken)))
+    result = {"requirements": results, "unassigned": unassigned}
+
+    with _cache_lock:
+        _cache[plan_id] = (version, result)
+        _cache.move_to_end(plan_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,147 @@
+"""
+Inverted index for full-text course search.
+
+Built from the catalog snapshot and kept in step with it: when the snapshot
+version changes only the courses that were added, removed or edited are
+re-indexed.
+"""
+import bisect
+import math
+import re
+import threading
+
+from api.services.catalog import get_catalog
+
+TOKEN_RE = re.compile(r"[A-Z0-9&]+")
+
+# Per-occurrence weight of a token depending on where it appears.
+FIELD_WEIGHTS = (
+    ("subject_code", 4.0),
+    ("number", 6.0),
+    ("subject_name", 2.0),
+    ("title", 3.0),
+    ("description", 0.5),
+)
+
+# Words too common in descriptions to be worth a posting.
+STOP_WORDS = {
+    "A", "AN", "AND", "ARE", "AS", "AT", "BE", "BY", "FOR", "FROM", "IN", "IS",
+    "IT", "OF", "ON", "OR", "THE", "TO", "WITH",
+}
+
+# How many vocabulary entries the trailing query token may expand to.
+MAX_PREFIX_EXPANSION = 50
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(str(text or "").upper()) if t not in STOP_WORDS]
+
+
+class SearchIndex:
+    def __init__(self):
+        self.version = None
+        self.postings = {}   # token -> {course_id: weighted term frequency}
+        self.vocabulary = []  # sorted tokens, for prefix expansion
+        self._signatures = {}  # course_id -> what the course was indexed from
+        self._doc_tokens = {}  # course_id -> tokens it was posted under
+
+    def _document(self, record, subject):
+        weights = {}
+        fields = dict(record)
+        fields["subject_name"] = subject["name"] if subject else ""
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[field]):
+                weights[token] = weights.get(token, 0.0) + weight
+        return weights
+
+    def _remove(self, course_id):
+        for token in self._doc_tokens.pop(course_id, ()):
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(course_id, None)
+                if not posting:
+                    del self.postings[token]
+        self._signatures.pop(course_id, None)
+
+    def sync(self, snapshot):
+        """Bring the index up to `snapshot`, re-indexing only courses that changed."""
+        if snapshot.version == self.version:
+            return
+
+        for course_id in set(self._signatures) - set(snapshot.by_id):
+            self._remove(course_id)
+
+        for record in snapshot.courses:
+            subject = snapshot.subject_by_id.get(record["subject_area_id"])
+            signature = (record["updated_at"], record["subject_code"], subject["name"] if subject else "")
+            if self._signatures.get(record["id"]) == signature:
+                continue
+            self._remove(record["id"])
+            document = self._document(record, subject)
+            for token, weight in document.items():
+                self.postings.setdefault(token, {})[record["id"]] = weight
+            self._doc_tokens[record["id"]] = tuple(document)
+            self._signatures[record["id"]] = signature
+
+        self.vocabulary = sorted(self.postings)
+        self.version = snapshot.version
+
+    def _expand_prefix(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        tokens = []
+        for token in self.vocabulary[start:start + MAX_PREFIX_EXPANSION]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def search(self, query, limit):
+        """
+        Returns [(course_id, score)] best first.
+
+        Every query token must match; the last one also matches as a prefix so
+        results keep up while the user is typing.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        total = max(len(self._signatures), 1)
+        scores = None
+        for i, token in enumerate(tokens):
+            expansions = [token]
+            if i == len(tokens) - 1:
+                expansions = self._expand_prefix(token) or expansions
+
+            token_scores = {}
+            for expanded in expansions:
+                posting = self.postings.get(expanded)
+                if not posting:
+                    continue
+                idf = math.log(1 + total / len(posting))
+                # Exact matches outrank completions of the trailing prefix.
+                boost = 1.0 if expanded == token else 0.5
+                for course_id, weight in posting.items():
+                    token_scores[course_id] = max(token_scores.get(course_id, 0.0), weight * idf * boost)
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {cid: s + token_scores[cid] for cid, s in scores.items() if cid in token_scores}
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+
+_lock = threading.Lock()
+_index = SearchIndex()
+
+
+def search_courses(query, limit):
+    """Searches the current catalog snapshot; returns [(course record, score)]."""
+    snapshot = get_catalog()
+    with _lock:
+        _index.sync(snapshot)
+        hits = _index.search(query, limit)
+    return [(snapshot.by_id[cid], score) for cid, score in hits if cid in snapshot.by_id]
@@ -1,3 +1,682 @@
-from django.test import TestCase
+import datetime as dt
+import random
+import time
+from decimal import Decimal
+from types import MappingProxyType
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from api.models import Course, CoursePrereqDepth, GradeRollup, Plan, PlanItem, Subject, UserProfile
+from api.services import prereqs
+from api.services.autocomplete import AutocompleteIndex
+from api.services.autofill import _Selector, autofill
+from api.services.catalog import CatalogSnapshot
+from api.services.grades import (
+    add_shares, add_to_summary, empty_rollup_summary, empty_summary, letter_bucket, mean_gpa, serialize_rollup,
+)
+from api.services.ordering import cell_key, key_between, keys_after, spread_keys
+from api.services.planning import plan_violations, violation_changes
+from api.services.prereqs import (
+    AND, OR, PrereqGraph, RefResolver, compile_requisites, evaluate, missing_courses, op_code,
+)
+from api.services.requirements import match_requirements
+from api.services.search import SearchIndex
+
+NOW = dt.datetime(2025, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def snapshot(requisites, subjects=(("COM SCI", "Computer Science"),), fields=None, version=1):
+    """
+    A catalog snapshot without the database. `requisites` maps course id ->
+    (subject index, number, requisites_parsed) or just requisites_parsed
+    (subject 0, number = id); `fields` overrides other fields per course id.
+    """
+    prereqs._compiled.clear()
+    subject_rows = [
+        MappingProxyType({"id": i + 1, "code": code, "name": name, "created_at": NOW, "updated_at": NOW})
+        for i, (code, name) in enumerate(subjects)
+    ]
+    courses = []
+    for course_id, spec in requisites.items():
+        subject, number, parsed = spec if isinstance(spec, tuple) else (0, str(course_id), spec)
+        code = subjects[subject][0]
+        courses.append(MappingProxyType({
+            "id": course_id, "subject_area_id": subject + 1, "subject_code": code, "number": number,
+            "title": f"{code} {number}", "units": "4.0", "updated_at": NOW, "requisites_parsed": parsed,
+            "requisites_program": None, "label_key": f"{code} {number}", "description": "",
+            **(fields or {}).get(course_id, {}),
+        }))
+    return CatalogSnapshot(version, courses, subject_rows)
+
+
+def course(course_id):
+    return {"course": course_id}
+
+
+def block(index, needs, options):
+    return {"index": index, "needs": needs, "needs_text": None, "options": [tuple(o) for o in options]}
+
+
+class CompileRequisitesTests(SimpleTestCase):
+    def resolve(self, ref):
+        return ref if isinstance(ref, int) else None
+
+    def test_id_tree(self):
+        tree = {"all_of": [course(1), {"any_of": [course(2), course(3)]}]}
+        self.assertEqual(
+            compile_requisites(tree, self.resolve),
+            [1, 2, 3, op_code(OR, 2), op_code(AND, 2)],
+        )
+
+    def test_lists_are_and_and_single_parts_need_no_operator(self):
+        self.assertEqual(compile_requisites([course(1), course(2)], self.resolve), [1, 2, op_code(AND, 2)])
+        self.assertEqual(compile_requisites({"any_of": [course(4)]}, self.resolve), [4])
+
+    def test_unresolved_references_are_dropped(self):
+        tree = {"all_of": [course(1), {"any_of": [course("nope"), course(None)]}]}
+        self.assertEqual(compile_requisites(tree, self.resolve), [1])
+        self.assertEqual(compile_requisites({"any_of": [course("x")]}, self.resolve), [])
+        self.assertEqual(compile_requisites(None, self.resolve), [])
+
+    def test_registrar_groups_resolve_codes_and_names(self):
+        catalog = snapshot(
+            {1: (0, "31", None), 2: (0, "32", None), 3: (1, "31A", None)},
+            subjects=(("COM SCI", "Computer Science"), ("MATH", "Mathematics")),
+        )
+        tree = {"requisites": [
+            {"type": "enforced", "groups": [
+                {"operator": "OR", "courses": [
+                    {"subject": "Computer Science", "number": "31"}, {"subject": "math", "number": "31a"},
+                ]},
+                {"operator": "AND", "courses": [{"subject": "COM SCI", "number": "32"}]},
+            ]},
+            {"type": "advisory", "groups": [{"operator": "AND", "courses": [{"subject": "MATH", "number": "31A"}]}]},
+        ]}
+        self.assertEqual(
+            compile_requisites(tree, RefResolver(catalog)),
+            [1, 3, op_code(OR, 2), 2, op_code(AND, 2)],
+        )
+
+    def test_string_ids_resolve_against_the_catalog(self):
+        resolve = RefResolver(snapshot({1: None, 2: None}))
+        self.assertEqual(compile_requisites({"any_of": [course("2"), course("99")]}, resolve), [2])
+
+    def test_evaluate(self):
+        program = [1, 2, 3, op_code(OR, 2), op_code(AND, 2)]
+        self.assertTrue(evaluate(program, {1, 3}.__contains__))
+        self.assertFalse(evaluate(program, {2, 3}.__contains__))
+        self.assertFalse(evaluate(program, {1}.__contains__))
+        self.assertTrue(evaluate([], {}.__contains__))
+
+    def test_missing_courses(self):
+        program = [1, 2, 3, op_code(OR, 2), op_code(AND, 2)]
+        self.assertEqual(missing_courses(program, set().__contains__), [1, 2, 3])
+        self.assertEqual(missing_courses(program, {2}.__contains__), [1])
+        self.assertEqual(missing_courses(program, {1, 2}.__contains__), [])
+
+
+class PrereqGraphTests(SimpleTestCase):
+    def setUp(self):
+        # 1 <- (2 or 3); 2 <- (1 or 4): a cycle with a way around it.
+        # 3 <- 5 and 6; 7 <- 7; 8 <- 9 <- 8: cycles with none.
+        self.graph = PrereqGraph(snapshot({
+            1: {"any_of": [course(2), course(3)]},
+            2: {"any_of": [course(1), course(4)]},
+            3: {"all_of": [course(5), course(6)]},
+            4: None, 5: None, 6: None,
+            7: course(7),
+            8: course(9),
+            9: course(8),
+            10: [course(3), course(2)],
+        }))
+
+    def test_edges(self):
+        self.assertEqual(self.graph.prereqs(3), [5, 6])
+        self.assertEqual(sorted(self.graph.dependents(2)), [1, 10])
+        self.assertEqual(self.graph.prereqs(7), [])
+        self.assertEqual(self.graph.prereqs(404), [])
+
+    def test_depths(self):
+        depths = {course_id: rest for course_id, *rest in self.graph.depths()}
+        self.assertEqual(depths[4], [0, 0, False])
+        self.assertEqual(depths[3], [1, 1, False])
+        self.assertEqual(depths[2], [1, None, True])
+        self.assertEqual(depths[1], [2, None, True])
+        self.assertEqual(depths[10], [2, None, False])
+        self.assertEqual(depths[7], [None, 0, False])
+        self.assertEqual(depths[8], [None, None, True])
+        self.assertEqual(depths[9], [None, None, True])
+
+    def test_breaks_cycle(self):
+        # 1 is in a later layer than 2, so only 2 -> 1 is dropped.
+        self.assertFalse(self.graph.breaks_cycle(1, 2))
+        self.assertTrue(self.graph.breaks_cycle(2, 1))
+        self.assertFalse(self.graph.breaks_cycle(1, 3))
+        self.assertTrue(self.graph.breaks_cycle(7, 7))
+        self.assertTrue(self.graph.breaks_cycle(8, 9))
+        self.assertTrue(self.graph.breaks_cycle(9, 8))
+
+    def test_eligible(self):
+        self.assertEqual(self.graph.eligible({4}), [2])
+        self.assertEqual(self.graph.eligible({4}, include_open=True), [2, 5, 6])
+        self.assertEqual(self.graph.eligible({4, 2}), [1])
+        self.assertEqual(self.graph.eligible({5, 6, 3, 4, 2}), [1, 10])
+        self.assertEqual(self.graph.eligible({9}), [8])
+
+    def test_closure(self):
+        self.assertEqual(self.graph.closure(10), ({10: 0, 3: 1, 2: 1, 5: 2, 6: 2, 1: 2, 4: 2}, False))
+        self.assertEqual(self.graph.closure(10, max_depth=1), ({10: 0, 3: 1, 2: 1}, True))
+
+
+
+def item(item_id, year_index, term, course_id, status="planned"):
+    return {"id": item_id, "year_index": year_index, "term": term, "course_id": course_id, "status": status}
+
+
+def planning_graph():
+    # 2 <- 1; 3 <- 2 and (1 or 4)
+    return PrereqGraph(snapshot({
+        1: None, 2: course(1), 3: [course(2), {"any_of": [course(1), course(4)]}], 4: None,
+    }))
+
+
+class PlanViolationTests(SimpleTestCase):
+    def setUp(self):
+        self.graph = planning_graph()
+
+    def test_prerequisite_in_the_same_term(self):
+        items = [item(10, 1, "FALL", 1), item(11, 1, "FALL", 2)]
+        violations = plan_violations(items, self.graph)
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(violations[0]["item_id"], 11)
+        self.assertEqual(violations[0]["missing"], [1])
+        self.assertEqual(violations[0]["later"], [1])
+
+    def test_earlier_terms_satisfy(self):
+        items = [item(10, 1, "FALL", 1), item(11, 1, "WINTER", 2), item(12, 2, "FALL", 3)]
+        self.assertEqual(plan_violations(items, self.graph), [])
+
+    def test_classes_taken_count_as_met(self):
+        items = [item(11, 1, "FALL", 2)]
+        self.assertEqual([v["missing"] for v in plan_violations(items, self.graph)], [[1]])
+        self.assertEqual(plan_violations(items, self.graph, taken_ids={1}), [])
+
+    def test_dropped_items_neither_count_nor_get_checked(self):
+        items = [item(10, 1, "FALL", 1, "dropped"), item(11, 1, "WINTER", 2), item(12, 1, "FALL", 3, "dropped")]
+        violations = plan_violations(items, self.graph)
+        self.assertEqual([(v["item_id"], v["missing"], v["later"]) for v in violations], [(11, [1], [])])
+
+    def test_violations_come_in_plan_order(self):
+        items = [item(12, 2, "FALL", 3), item(11, 1, "WINTER", 2)]
+        self.assertEqual([v["item_id"] for v in plan_violations(items, self.graph)], [11, 12])
+
+
+
+class ViolationChangesTests(SimpleTestCase):
+    def setUp(self):
+        self.graph = planning_graph()
+
+    def move(self, items, item_id, year_index, term):
+        return [dict(it, year_index=year_index, term=term) if it["id"] == item_id else it for it in items]
+
+    def test_moving_a_prerequisite_later_creates_a_dependent_violation(self):
+        before = [item(10, 1, "FALL", 1), item(11, 1, "WINTER", 2)]
+        changes = violation_changes(before, self.move(before, 10, 1, "SPRING"), 1, self.graph)
+        self.assertEqual([(v["item_id"], v["missing"], v["later"]) for v in changes["created"]], [(11, [1], [1])])
+        self.assertEqual(changes["resolved"], [])
+
+    def test_moving_a_course_after_its_prerequisite_resolves_it(self):
+        before = [item(10, 1, "WINTER", 1), item(11, 1, "FALL", 2)]
+        changes = violation_changes(before, self.move(before, 11, 1, "SPRING"), 2, self.graph)
+        self.assertEqual(changes["created"], [])
+        self.assertEqual([v["item_id"] for v in changes["resolved"]], [11])
+
+    def test_unchanged_violations_are_not_reported(self):
+        # 3 stays short of 2 either way; only 2's own violation is resolved.
+        before = [item(11, 1, "FALL", 2), item(12, 1, "FALL", 3), item(10, 1, "WINTER", 1)]
+        after = self.move(before, 10, 0, "FALL")
+        changes = violation_changes(before, after, 1, self.graph)
+        self.assertEqual([v["item_id"] for v in changes["resolved"]], [11])
+        self.assertEqual(changes["created"], [])
+
+    def test_classes_taken_are_met_before_and_after(self):
+        before = [item(10, 1, "FALL", 1), item(11, 1, "WINTER", 2)]
+        after = self.move(before, 10, 1, "SPRING")
+        changes = violation_changes(before, after, 1, self.graph, taken_ids={1})
+        self.assertEqual(changes, {"created": [], "resolved": []})
+
+
+class OrderingKeyTests(SimpleTestCase):
+    def test_key_between(self):
+        self.assertEqual(key_between(None, None), "V")
+        self.assertEqual(key_between("V", None), "k")
+        self.assertEqual(key_between("V", "W"), "VV")
+        self.assertEqual(key_between(None, "1"), "0V")
+        with self.assertRaises(ValueError):
+            key_between("W", "V")
+        with self.assertRaises(ValueError):
+            key_between("V", "V")
+
+    def test_random_inserts_stay_ordered(self):
+        rng = random.Random(0)
+        keys = []
+        for _ in range(500):
+            i = rng.randint(0, len(keys))
+            key = key_between(keys[i - 1] if i else None, keys[i] if i < len(keys) else None)
+            self.assertFalse(key.endswith("0"))
+            keys.insert(i, key)
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_keys_after(self):
+        keys = keys_after("V", 20)
+        self.assertEqual(keys, sorted(keys))
+        self.assertGreater(keys[0], "V")
+
+    def test_spread_keys(self):
+        for n in (1, 2, 61, 62, 500):
+            keys = spread_keys(n)
+            self.assertEqual(len(keys), n)
+            self.assertEqual(keys, sorted(set(keys)))
+            self.assertTrue(all(k and not k.endswith("0") for k in keys))
+        self.assertTrue(all(len(k) <= 2 for k in spread_keys(500)))
+
+    def test_cell_key(self):
+        cell = {1: "V", 2: "k", 3: None}
+        self.assertEqual(cell_key(cell), key_between("k", None))
+        self.assertEqual(cell_key(cell, after_id=1), key_between("V", "k"))
+        self.assertEqual(cell_key(cell, before_id=1), key_between(None, "V"))
+        self.assertEqual(cell_key({}), "V")
+        with self.assertRaises(ValueError):
+            cell_key(cell, after_id=3)
+        with self.assertRaises(ValueError):
+            cell_key(cell, before_id=99)
+
+
+class AutofillTests(SimpleTestCase):
+    def test_selector_picks_the_cheapest_option(self):
+        graph = PrereqGraph(snapshot({1: None, 2: course(1), 3: course(2), 4: None, 5: course(4)}))
+        selector = _Selector(graph, set())
+        self.assertEqual(selector.cost(3), (3, frozenset({1, 2, 3})))
+        unmet = selector.satisfy([block(0, 1, [(3,), (5,)])])
+        self.assertEqual(unmet, [])
+        self.assertEqual(selector.chosen, {4, 5})
+
+    def test_selector_counts_what_is_had(self):
+        graph = PrereqGraph(snapshot({1: None, 2: course(1), 3: course(2)}))
+        selector = _Selector(graph, {1})
+        self.assertEqual(selector.cost(3), (2, frozenset({2, 3})))
+        self.assertEqual(selector.cost(1), (0, frozenset()))
+
+    def test_selector_routes_around_cycles(self):
+        graph = PrereqGraph(snapshot({
+            1: {"any_of": [course(2), course(3)]},
+            2: {"any_of": [course(1), course(4)]},
+            3: None, 4: None, 7: course(7), 8: course(9), 9: course(8),
+        }))
+        selector = _Selector(graph, set())
+        self.assertEqual(selector.cost(1), (2, frozenset({1, 3})))
+        self.assertEqual(selector.cost(2), (2, frozenset({2, 4})))
+        self.assertIsNone(selector.cost(7))
+        self.assertIsNone(selector.cost(8))
+        unmet = selector.satisfy([block(0, 1, [(8,), (9,)])])
+        self.assertEqual(unmet[0][1], 1)
+
+    def test_selector_is_not_exponential(self):
+        # Course 2k + 1 and 2k + 2 each need course 2k - 1 or 2k: 2^40 paths.
+        requisites = {1: None, 2: None}
+        for k in range(1, 41):
+            for c in (2 * k + 1, 2 * k + 2):
+                requisites[c] = {"any_of": [course(2 * k - 1), course(2 * k)]}
+        graph = PrereqGraph(snapshot(requisites))
+        with mock.patch.object(_Selector, "cost", autospec=True, side_effect=_Selector.cost) as cost:
+            self.assertEqual(_Selector(graph, set()).cost(81)[0], 41)
+        # Memoized: the root plus one call per edge of courses 3..81, not one per path.
+        self.assertEqual(cost.call_count, 1 + 2 * 79)
+
+    def test_selector_stops_at_the_deadline(self):
+        graph = PrereqGraph(snapshot({1: None, 2: None}))
+        selector = _Selector(graph, set())
+        unmet = selector.satisfy([block(0, 1, [(1,)]), block(1, 1, [(2,)])], deadline=time.monotonic() - 1)
+        self.assertTrue(selector.timed_out)
+        self.assertEqual([short for _, short in unmet], [1, 1])
+        self.assertEqual(selector.chosen, set())
+
+    def test_autofill_places_chains_in_order(self):
+        catalog = snapshot({1: None, 2: course(1), 3: course(2), 4: None})
+        graph = PrereqGraph(catalog)
+        cells = [(1, "FALL"), (1, "WINTER"), (1, "SPRING")]
+        result = autofill(
+            [], {4}, [block(0, 2, [(3,), (4,)])], graph, catalog, cells, {"FALL": 8, "WINTER": 8, "SPRING": 8},
+            budget_ms=20,
+        )
+        self.assertEqual(result["placements"], [(1, "FALL", 1), (1, "WINTER", 2), (1, "SPRING", 3)])
+        self.assertEqual((result["unplaced"], result["unmet"], result["timed_out"]), ([], [], False))
+
+    def test_autofill_skips_cells_holding_the_course_as_dropped(self):
+        catalog = snapshot({1: None})
+        items = [{"id": 1, "year_index": 1, "term": "FALL", "course_id": 1, "status": "dropped"}]
+        result = autofill(
+            items, set(), [block(0, 1, [(1,)])], PrereqGraph(catalog), catalog, [(1, "FALL"), (1, "WINTER")],
+            {"FALL": 16, "WINTER": 16}, budget_ms=20,
+        )
+        self.assertEqual(result["placements"], [(1, "WINTER", 1)])
+
+    def test_autofill_respects_unit_caps(self):
+        catalog = snapshot({1: None, 2: None, 3: None})
+        graph = PrereqGraph(catalog)
+        result = autofill(
+            [], set(), [block(0, 3, [(1,), (2,), (3,)])], graph, catalog, [(1, "FALL"), (1, "WINTER")],
+            {"FALL": 4, "WINTER": 4}, budget_ms=20,
+        )
+        self.assertEqual(len(result["placements"]), 2)
+        self.assertEqual(len(result["unplaced"]), 1)
+
+
+class MatchRequirementsTests(SimpleTestCase):
+    A, B, X = 1, 2, 3
+
+    def assigned(self, results):
+        return [sorted(s["course_id"] for s in r["satisfied_by"]) for r in results]
+
+    def test_fills_every_block_whatever_the_order(self):
+        first = block(0, 2, [(self.A, self.B), (self.X,)])
+        second = block(1, 1, [(self.A,)])
+        had = {self.A: 10, self.B: 11}
+
+        results, unassigned = match_requirements([first, second], had)
+        self.assertEqual(self.assigned(results), [[self.B], [self.A]])
+        self.assertEqual([r["remaining"] for r in results], [1, 0])
+        self.assertEqual(unassigned, [])
+
+        results, unassigned = match_requirements([second, first], had)
+        self.assertEqual(self.assigned(results), [[self.A], [self.B]])
+        self.assertEqual([r["remaining"] for r in results], [0, 1])
+        self.assertEqual(unassigned, [])
+
+    def test_an_option_counts_once_per_block(self):
+        results, unassigned = match_requirements(
+            [block(0, 2, [(self.A, self.B), (self.X,)])], {self.A: 10, self.B: 11},
+        )
+        self.assertEqual(len(results[0]["satisfied_by"]), 1)
+        self.assertEqual(results[0]["remaining"], 1)
+        self.assertEqual(results[0]["open_options"], [[self.X]])
+        self.assertEqual(len(unassigned), 1)
+
+    def test_a_course_counts_toward_one_block(self):
+        blocks = [block(0, 1, [(self.A,), (self.B,)]), block(1, 1, [(self.A,)])]
+        results, unassigned = match_requirements(blocks, {self.A: 10, self.B: 11})
+        self.assertEqual(self.assigned(results), [[self.B], [self.A]])
+        self.assertEqual(unassigned, [])
+
+    def test_classes_taken_are_never_unassigned(self):
+        results, unassigned = match_requirements([block(0, 1, [(self.X,)])], {self.A: None, self.B: 11})
+        self.assertEqual(results[0]["remaining"], 1)
+        self.assertEqual(unassigned, [self.B])
+
+    def test_long_chain_of_displacements(self):
+        # Block i takes course i or i + 1; greedily giving each block its
+        # lower course starves the last one.
+        blocks = [block(i, 1, [(i + 1,), (i + 2,)]) for i in range(20)]
+        blocks.append(block(20, 1, [(1,)]))
+        results, _ = match_requirements(blocks, {c: c for c in range(1, 22)})
+        self.assertTrue(all(r["remaining"] == 0 for r in results))
+
+
+
+def small_catalog(version=1, edits=None):
+    return snapshot(
+        {1: (0, "31", None), 2: (0, "32", None), 3: (1, "31A", None)},
+        subjects=(("COM SCI", "Computer Science"), ("MATH", "Mathematics")),
+        fields={
+            1: {"title": "Introduction to Computer Science I", "description": "Programming in C++."},
+            2: {"title": "Introduction to Computer Science II", "description": "Data structures."},
+            3: {"title": "Differential and Integral Calculus", "description": "Limits and derivatives."},
+            **(edits or {}),
+        },
+        version=version,
+    )
+
+
+class SearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.sync(small_catalog())
+
+    def ids(self, query, limit=10):
+        return [course_id for course_id, _ in self.index.search(query, limit)]
+
+    def test_every_token_must_match(self):
+        self.assertEqual(sorted(self.ids("computer science")), [1, 2])
+        self.assertEqual(self.ids("computer calculus"), [])
+        self.assertEqual(self.ids("the"), [])
+
+    def test_last_token_matches_as_a_prefix(self):
+        self.assertEqual(self.ids("calc"), [3])
+        self.assertEqual(self.ids("com sci struct"), [2])
+
+    def test_exact_matches_rank_first(self):
+        self.assertEqual(self.ids("31"), [1, 3])
+        self.assertEqual(self.ids("31", limit=1), [1])
+
+    def test_sync_reindexes_edited_and_removed_courses(self):
+        later = NOW.replace(year=2026)
+        catalog = small_catalog(version=2, edits={3: {"title": "Linear Algebra", "updated_at": later}})
+        self.index.sync(catalog)
+        self.assertEqual(self.ids("calculus"), [])
+        self.assertEqual(self.ids("linear"), [3])
+
+        catalog = snapshot({1: (0, "31", None)}, fields={1: {"title": "Introduction to Computer Science I"}}, version=3)
+        self.index.sync(catalog)
+        self.assertEqual(self.ids("intro"), [1])
+        self.assertEqual(self.ids("linear"), [])
+        self.assertNotIn("LINEAR", self.index.postings)
+
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex(small_catalog())
+
+    def test_labels_match_ignoring_whitespace(self):
+        self.assertEqual(self.index.lookup("COMSCI31", 10), [1])
+        self.assertEqual(self.index.lookup("com sci 3", 10), [1, 2])
+        self.assertEqual(self.index.lookup("math31", 10), [3])
+
+    def test_titles_match_from_any_later_word(self):
+        self.assertEqual(self.index.lookup("differential", 10), [3])
+        self.assertEqual(self.index.lookup("calc", 10), [3])
+        self.assertEqual(self.index.lookup("integral calc", 10), [3])
+        self.assertEqual(self.index.lookup("and integral", 10), [])
+
+    def test_labels_rank_before_titles(self):
+        index = AutocompleteIndex(snapshot(
+            {1: (0, "31", None), 2: (1, "1", None)},
+            subjects=(("COM SCI", "Computer Science"), ("MATH", "Mathematics")),
+            fields={1: {"title": "Math for Programmers"}, 2: {"title": "Precalculus"}},
+        ))
+        self.assertEqual(index.lookup("math", 10), [2, 1])
+        self.assertEqual(index.lookup("math", 1), [2])
+
+    def test_limit_and_blank_prefix(self):
+        self.assertEqual(self.index.lookup("com sci", 1), [1])
+        self.assertEqual(self.index.lookup("  ", 10), [])
+
+
+
+class GradeSummaryTests(SimpleTestCase):
+    def test_letter_bucket(self):
+        self.assertEqual([letter_bucket(g) for g in ("A+", "A-", "B", "F", "P", "NP")], ["A", "A", "B", "F", "P", "NP"])
+
+    def test_mean_gpa_counts_letter_grades_only(self):
+        self.assertEqual(mean_gpa({"A": 3, "B-": 1, "P": 10, "NP": 2}), 3.675)
+        self.assertEqual(mean_gpa({"A+": 1, "A": 1, "A-": 1}), 3.9)
+        self.assertIsNone(mean_gpa({"P": 4, "NP": 1}))
+        self.assertIsNone(mean_gpa({}))
+
+    def test_add_shares(self):
+        summary = add_shares({"graded": 8, "grade_counts": {"A+": 1, "A": 2, "A-": 1, "B": 3, "P": 1}})
+        self.assertEqual(summary["grade_shares"], {"A+": 0.125, "A": 0.25, "A-": 0.125, "B": 0.375, "P": 0.125})
+        self.assertEqual(summary["letter_shares"], {"A": 0.5, "B": 0.375, "P": 0.125})
+
+        summary = add_shares({"graded": 3, "grade_counts": {"A": 1, "B": 2}})
+        self.assertEqual(summary["letter_shares"], {"A": 0.3333, "B": 0.6667})
+
+    def test_add_shares_with_nothing_graded(self):
+        summary = add_shares({"graded": 0, "grade_counts": {}})
+        self.assertEqual((summary["grade_shares"], summary["letter_shares"]), ({}, {}))
+
+
+
+class GradeRollupTests(SimpleTestCase):
+    def test_add_to_summary_folds_rows_per_term(self):
+        summary = empty_summary()
+        rows = [
+            ("24F", "A", 10, 30, 1), ("24F", "B", 15, 0, 0), ("24F", "P", 5, 0, 0),
+            ("25W", "A", Decimal(4), Decimal(12), 1), ("25W", "C", 8, 0, 0),
+        ]
+        for row in rows:
+            add_to_summary(summary, *row)
+        self.assertEqual(summary["graded"], 42)
+        self.assertEqual(summary["enrolled"], 42)
+        self.assertEqual(summary["offerings"], 2)
+        self.assertEqual(summary["grade_counts"], {"A": 14, "B": 15, "P": 5, "C": 8})
+        self.assertEqual(list(summary["terms"].values()), [
+            {"term": "24F", "graded": 30, "enrolled": 30},
+            {"term": "25W", "graded": 12, "enrolled": 12},
+        ])
+        self.assertIsInstance(summary["graded"], int)
+
+    def test_serialize_rollup(self):
+        rollup = GradeRollup(
+            course_id=1, instructor="Smallberg", grades_json={"A": 3, "A-": 1}, terms=[],
+            graded=4, total_enrolled=5, offerings=1, mean_gpa=Decimal("3.925"), refreshed_at=NOW,
+        )
+        summary = serialize_rollup(rollup)
+        self.assertEqual(summary["mean_gpa"], 3.925)
+        self.assertEqual(summary["instructor"], "Smallberg")
+        self.assertEqual(summary["letter_shares"], {"A": 1.0})
+
+        rollup.instructor, rollup.mean_gpa = "", None
+        summary = serialize_rollup(rollup)
+        self.assertNotIn("instructor", summary)
+        self.assertIsNone(summary["mean_gpa"])
+
+    def test_empty_rollup_summary(self):
+        self.assertEqual(empty_rollup_summary(), {
+            "graded": 0, "enrolled": 0, "offerings": 0, "grade_counts": {}, "terms": [],
+            "mean_gpa": None, "grade_shares": {}, "letter_shares": {},
+        })
+
+
+class PlanViewTestCase(TestCase):
+    """Request-level tests; the unmanaged plan tables are created in the test database."""
+
+    models = (UserProfile, Plan, PlanItem)
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            for model in cls.models:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(cls.models):
+                editor.delete_model(model)
+
+    def setUp(self):
+        self.profile = UserProfile.objects.create(name="Test")
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_USER_ID=str(self.profile.id))
+        self.plan = Plan.objects.create(user_id=self.profile.id, name="Plan")
+
+    def add_item(self, year_index, term, course_id, **fields):
+        return PlanItem.objects.create(
+            plan_id=self.plan.id, year_index=year_index, term=term, course_id=course_id, **fields,
+        )
+
+
+class PlanItemsBatchViewTests(PlanViewTestCase):
+    def batch(self, ops):
+        return self.client.post(f"/api/plans/{self.plan.id}/items/batch/", {"ops": ops}, format="json")
+
+    def test_bare_move_changes_nothing(self):
+        item = self.add_item(1, "FALL", 1, sort_key="V")
+        response = self.batch([{"op": "move", "id": item.id}, {"op": "update", "id": item.id}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(it["id"], it["sort_key"]) for it in response.json()["items"]], [(item.id, "V")])
+
+    def test_invalid_id_is_rejected(self):
+        self.add_item(1, "FALL", 1)
+        response = self.batch([{"op": "delete", "id": [1]}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PlanItem.objects.count(), 1)
+
+
+class PlanAutofillViewTests(PlanViewTestCase):
+    def test_rejects_malformed_options(self):
+        for body in ({"years": True}, {"time_budget_ms": True}, {"terms": [{}]}, {"terms": ["FALL", 1]},
+                     {"dry_run": "false"}):
+            response = self.client.post(f"/api/plans/{self.plan.id}/autofill/", body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+
+
+@mock.patch("api.services.catalog._snapshot", None)
+class PlanSeedingViewTests(PlanViewTestCase):
+    models = (Subject, Course, CoursePrereqDepth, *PlanViewTestCase.models)
+
+    def setUp(self):
+        super().setUp()
+        com_sci = Subject.objects.create(code="COM SCI", name="Computer Science")
+        self.courses = {
+            number: Course.objects.create(
+                subject_area_id=com_sci.id, number=number, title=f"Course {number}", description="",
+                units="4.0", requisites_text="", label_key=f"COM SCI {number}",
+            ).id
+            for number in ("31", "32", "33")
+        }
+
+    def create_plan(self, classes_taken):
+        self.profile.classes_taken = classes_taken
+        self.profile.save(update_fields=["classes_taken"])
+        response = self.client.post("/api/plans/", {"name": "Seeded"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_seeds_completed_items_from_classes_taken(self):
+        body = self.create_plan([
+            {"course": "com sci 31", "quarter": "FA23"},
+            {"course": "COM SCI 32", "quarter": "WI24"},
+            {"course": "COM SCI 33", "quarter": "WI24"},
+            {"course": "COM SCI 31", "quarter": "FA23"},
+            {"course": "COM SCI 1", "quarter": "FA23"},
+            {"course": "COM SCI 33", "quarter": "SP22"},
+            {"course": "COM SCI 32", "quarter": "F"},
+        ])
+        self.assertEqual(body["seeded_items"], 3)
+        self.assertEqual(body["start_year"], 2023)
+        self.assertEqual([(s["course"], s["reason"]) for s in body["skipped_labels"]], [
+            ("COM SCI 32", "missing course or quarter"),
+            ("COM SCI 1", "unknown course"),
+            ("COM SCI 33", "before start year"),
+        ])
+
+        items = PlanItem.objects.filter(plan_id=body["id"]).order_by("year_index", "term", "sort_key")
+        self.assertEqual([(it.year_index, it.term, it.course_id, it.status) for it in items], [
+            (1, "FALL", self.courses["31"], PlanItem.Status.COMPLETED),
+            (1, "WINTER", self.courses["32"], PlanItem.Status.COMPLETED),
+            (1, "WINTER", self.courses["33"], PlanItem.Status.COMPLETED),
+        ])
+
+    def test_sets_start_year_when_no_course_resolves(self):
+        body = self.create_plan([{"course": "COM SCI 1", "quarter": "SP25"}])
+        self.assertEqual(body["seeded_items"], 0)
+        self.assertEqual(body["start_year"], 2024)
+        self.assertEqual(Plan.objects.get(id=body["id"]).start_year, 2024)
@@ -1,11 +1,16 @@
 from django.urls import path
-from api.views.courses import list_courses, course_prereqs, courses_by_ids, courses_by_labels, course_grades
+from api.views.courses import list_courses, course_prereqs, courses_by_ids, courses_by_labels, course_grades, course_search, course_autocomplete, course_grades_batch, course_prereq_tree, course_unlocks
 
 urlpatterns = [
     path("by-ids/", courses_by_ids),
     path("by-labels/", courses_by_labels),
+    path("search/", course_search),
+    path("autocomplete/", course_autocomplete),
+    path("grades/", course_grades_batch),
     path("", list_courses),
     path("<int:subject_area_id>/", list_courses),
     path("<int:course_id>/requisites/", course_prereqs),
+    path("<int:course_id>/prereq-tree/", course_prereq_tree),
+    path("<int:course_id>/unlocks/", course_unlocks),
     path("<int:course_id>/grades/", course_grades),
 ]
\ No newline at end of file
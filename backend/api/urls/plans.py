@@ -1,9 +1,19 @@
 from django.urls import path
-from api.views.plans import plans_view, plan_items_view, plan_item_detail_view, plan_detail_view
+from api.views.plans import (
+    plans_view, plan_items_view, plan_item_detail_view, plan_detail_view, plan_validate_view, plan_autofill_view,
+    plan_requirements_view, plan_items_batch_view,
+    plan_full_view, plan_clone_view,
+)
 
 urlpatterns = [
     path("", plans_view),
     path("<int:plan_id>", plan_detail_view),
     path("<int:plan_id>/items/", plan_items_view),
-    path("<int:plan_id>/items/<int:item_id>", plan_item_detail_view)
+    path("<int:plan_id>/items/batch/", plan_items_batch_view),
+    path("<int:plan_id>/items/<int:item_id>", plan_item_detail_view),
+    path("<int:plan_id>/full/", plan_full_view),
+    path("<int:plan_id>/clone/", plan_clone_view),
+    path("<int:plan_id>/validate/", plan_validate_view),
+    path("<int:plan_id>/autofill/", plan_autofill_view),
+    path("<int:plan_id>/requirements/", plan_requirements_view),
 ]
\ No newline at end of file
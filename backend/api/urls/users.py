@@ -1,9 +1,10 @@
 from django.urls import path
-from api.views.users import get_profile, update_profile
+from api.views.users import get_profile, update_profile, eligible_courses
 
 urlpatterns = [
     path("", get_profile),
     path("update/", update_profile),
+    path("eligible/", eligible_courses),
     
 
 ]
\ No newline at end of file
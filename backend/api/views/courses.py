@@ -1,31 +1,164 @@
-import re
+import base64
+import binascii
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from api.models.course import Course
-from api.models.subject import Subject
+from rest_framework.utils.encoders import JSONEncoder
 from api.models.gradeDistribution import GradeDistribution
+from api.models.gradeRollup import GradeRollup
+from api.services.autocomplete import autocomplete
+from api.services.catalog import COURSE_FIELDS, SUMMARY_FIELDS, get_catalog, normalize_label, resolve_labels
+from api.services.conditional import make_etag
+from api.services.fields import parse_fields
+from api.services.grades import summarize_courses
+from api.services.prereqs import get_prereq_graph
+from api.services.search import search_courses
 
+# Unfiltered listings are paginated by default; a subject listing returns the
+# whole subject unless the client asks for a page size.
+COURSE_PAGE_SIZE = 500
+MAX_COURSE_PAGE_SIZE = 2000
+
+# Keys each endpoint returns for a course by default.
+LIST_FIELDS = (
+    "id", "subject_area_id", "number", "title", "description", "units",
+    "requisites_text", "created_at", "updated_at", "requisites_parsed",
+    "prereq_layer", "prereq_chain_length", "prereq_cycle",
+)
+DETAIL_FIELDS = (
+    "id", "subject_area_id", "subject_code", "number", "title", "description",
+    "units", "requisites_text", "requisites_parsed",
+    "prereq_layer", "prereq_chain_length", "prereq_cycle",
+)
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+MAX_GRADE_BATCH = 200
+MAX_PREREQ_DEPTH = 20
+
+
+def _project(record, fields):
+    return {f: record[f] for f in fields}
+
+
+def _course_fields(request, default):
+    return parse_fields(request.query_params.get("fields"), COURSE_FIELDS, default)
+
+
+def _encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(token):
+    """Return the last course id encoded in a `next_cursor` token (ValueError if malformed)."""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError) as ex:
+        raise ValueError(str(ex))
+
+
+def _stream_courses(rows, fields, next_cursor=None):
+    """Yield the `{"courses": [...], "next_cursor": ...}` body one row at a time."""
+    encoder = JSONEncoder()
+    yield '{"courses": ['
+    first = True
+    for record in rows:
+        yield ("" if first else ",") + encoder.encode(_project(record, fields))
+        first = False
+    yield '], "next_cursor": ' + encoder.encode(next_cursor) + "}"
+
+
+def _catalog_etag(request, *args, **kwargs):
+    return make_etag(get_catalog().version, request.get_full_path())
+
+
+def _catalog_last_modified(request, subject_area_id=None):
+    return get_catalog().last_modified(subject_area_id)
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_catalog_etag, last_modified_func=_catalog_last_modified)
 @api_view(["GET"])
 def list_courses(request, subject_area_id = None):
+    """
+    Lists courses ordered by id, optionally scoped to one subject area.
+
+    Pagination is keyset-based: pass the `next_cursor` of a previous page as
+    `?cursor=` to continue after it, and `?limit=` to size the page. With
+    `?stream=1` the remaining rows are written out one at a time instead of
+    being collected into one response. `?fields=id,number,title` limits each
+    row to the listed fields.
+
+    `?subject_ids=1,2,3` fetches several whole subjects at once and answers
+    with their courses grouped by subject.
+    """
     if request.method == "GET":
-        if not subject_area_id:
-            courses = Course.objects.all().order_by("id")
-        else:
-            courses = Course.objects.filter(subject_area_id=subject_area_id).order_by("id")
-        data = []
-        for course in courses:
-            data.append({
-                "id": course.id,
-                "subject_area_id": course.subject_area_id,
-                "number": course.number,
-                "title": course.title,
-                "description": course.description,
-                "units": course.units,
-                "requisites_text": course.requisites_text,
-                "created_at": course.created_at,
-                "updated_at": course.updated_at,
-                "requisites_parsed": course.requisites_parsed,})
-        return Response({"courses": data})
+        try:
+            fields = _course_fields(request, LIST_FIELDS)
+        except ValueError as ex:
+            return Response({"error": str(ex)}, status=400)
+
+        subject_ids_param = request.query_params.get("subject_ids")
+        if subject_ids_param is not None:
+            if subject_area_id or any(p in request.query_params for p in ("cursor", "limit", "stream")):
+                return Response(
+                    {"error": "subject_ids cannot be combined with a subject path, cursor, limit or stream"},
+                    status=400,
+                )
+            try:
+                subject_ids = [int(x) for x in subject_ids_param.split(",") if x.strip()]
+            except ValueError:
+                return Response({"error": "subject_ids must be comma-separated integers"}, status=400)
+
+            by_subject = get_catalog().by_subject
+            data = [
+                {
+                    "subject_area_id": subject_id,
+                    "courses": [_project(record, fields) for record in by_subject.get(subject_id, ())],
+                }
+                for subject_id in dict.fromkeys(subject_ids)
+            ]
+            return Response({"subjects": data})
+
+        last_id = None
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            try:
+                last_id = _decode_cursor(cursor)
+            except ValueError:
+                return Response({"error": "invalid cursor"}, status=400)
+
+        limit = request.query_params.get("limit")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return Response({"error": "limit must be an integer"}, status=400)
+            if limit <= 0:
+                return Response({"error": "limit must be positive"}, status=400)
+            limit = min(limit, MAX_COURSE_PAGE_SIZE)
+
+        rows = get_catalog().courses_after(last_id, subject_area_id)
+
+        stream = request.query_params.get("stream", "").lower() in ("1", "true")
+        if limit is None and not subject_area_id and not stream:
+            limit = COURSE_PAGE_SIZE
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1]["id"])
+
+        if stream:
+            return StreamingHttpResponse(_stream_courses(rows, fields, next_cursor), content_type="application/json")
+
+        data = [_project(record, fields) for record in rows]
+        return Response({"courses": data, "next_cursor": next_cursor})
     
 @api_view(["GET"])
 def courses_by_ids(request):
@@ -36,96 +169,277 @@ def courses_by_ids(request):
         return Response({"error": "ids must be comma-separated integers"}, status=400)
     if not ids:
         return Response({"courses": []})
+    try:
+        fields = _course_fields(request, DETAIL_FIELDS)
+    except ValueError as ex:
+        return Response({"error": str(ex)}, status=400)
+
+    catalog = get_catalog()
+    data = [
+        _project(catalog.by_id[course_id], fields)
+        for course_id in sorted(set(ids))
+        if course_id in catalog.by_id
+    ]
+    return Response({"courses": data})
+
+
+@api_view(["GET"])
+def course_search(request):
+    """
+    Ranked full-text search over subject code, number, title and description.
+
+    `?q=` is the query, `?limit=` caps the results (default 20, max 100) and
+    `?fields=` picks the course fields returned with each score.
+    """
+    query = request.query_params.get("q", "").strip()
+    try:
+        limit = min(int(request.query_params.get("limit", SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+    if limit <= 0:
+        return Response({"error": "limit must be positive"}, status=400)
+    try:
+        fields = _course_fields(request, SUMMARY_FIELDS)
+    except ValueError as ex:
+        return Response({"error": str(ex)}, status=400)
 
-    courses = Course.objects.filter(id__in=ids).order_by("id")
-    # Build subject code lookup
-    subject_ids = set(c.subject_area_id for c in courses)
-    subjects = {s.id: s.code for s in Subject.objects.filter(id__in=subject_ids)}
+    if not query:
+        return Response({"query": query, "courses": []})
 
     data = []
-    for c in courses:
-        data.append({
-            "id": c.id,
-            "subject_area_id": c.subject_area_id,
-            "subject_code": subjects.get(c.subject_area_id, ""),
-            "number": c.number,
-            "title": c.title,
-            "description": c.description,
-            "units": c.units,
-            "requisites_text": c.requisites_text,
-            "requisites_parsed": c.requisites_parsed,
-        })
-    return Response({"courses": data})
+    for record, score in search_courses(query, limit):
+        row = _project(record, fields)
+        row["score"] = round(score, 3)
+        data.append(row)
+    return Response({"query": query, "courses": data})
+
+
+@api_view(["GET"])
+def course_autocomplete(request):
+    """
+    Top completions for a partially typed label or title, e.g. `?prefix=COMSCI3`.
+
+    Label matches come first, then titles starting with the prefix, then titles
+    with a later word starting with it. `?limit=` defaults to 10 (max 50).
+    """
+    prefix = request.query_params.get("prefix", "")
+    try:
+        limit = min(int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT)), MAX_AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+    if limit <= 0:
+        return Response({"error": "limit must be positive"}, status=400)
+
+    data = []
+    for record in autocomplete(prefix, limit):
+        row = _project(record, SUMMARY_FIELDS)
+        row["label"] = record["label_key"]
+        data.append(row)
+    return Response({"prefix": prefix, "suggestions": data})
 
 
 @api_view(["GET"])
 def course_prereqs(request, course_id = None):
+    """
+    Requisites of one course: the raw `requisites_parsed` JSON, its compiled
+    postfix program and the ids of the courses it names.
+    """
     if request.method == "GET":
-        if not course_id:
-            #error
-            pass
-        try:
-            reqs = Course.objects.values_list("requisites_parsed", flat=True).get(id=course_id)
-        except Course.DoesNotExist:
-            reqs = None
-        
-        if reqs is None:
-            reqs = {}
+        record = get_catalog().by_id.get(course_id)
+        graph = get_prereq_graph()
 
         return Response({
             "course_id": course_id,
-            "requisites": reqs
+            "requisites": (record["requisites_parsed"] if record else None) or {},
+            "program": graph.program(course_id),
+            "prerequisites": graph.prereqs(course_id),
         })
 
+
+@api_view(["GET"])
+def course_prereq_tree(request, course_id):
+    """
+    The full transitive prerequisite chain of a course in one response.
+
+    Every course reachable through prerequisites is listed once with its
+    shortest distance from the requested course (`depth`) and its direct
+    prerequisite ids, so clients can rebuild the tree. `?depth=` limits how far
+    down to walk (default and max 20); `truncated` says whether it cut anything.
+    """
+    try:
+        max_depth = min(int(request.query_params.get("depth", MAX_PREREQ_DEPTH)), MAX_PREREQ_DEPTH)
+    except ValueError:
+        return Response({"error": "depth must be an integer"}, status=400)
+    if max_depth < 0:
+        return Response({"error": "depth must be non-negative"}, status=400)
+
+    catalog = get_catalog()
+    if course_id not in catalog.by_id:
+        return Response({"error": "course not found"}, status=404)
+
+    graph = get_prereq_graph()
+    depths, truncated = graph.closure(course_id, max_depth)
+    data = []
+    for cid, depth in sorted(depths.items(), key=lambda kv: (kv[1], kv[0])):
+        row = _project(catalog.by_id[cid], SUMMARY_FIELDS)
+        row["depth"] = depth
+        row["prereqs"] = graph.prereqs(cid)
+        data.append(row)
+    return Response({"course_id": course_id, "depth": max_depth, "truncated": truncated, "courses": data})
+
+
+@api_view(["GET"])
+def course_unlocks(request, course_id):
+    """
+    Courses that require this one. `?mode=direct` (default) lists the courses
+    naming it as a prerequisite; `?mode=transitive` follows the chain upward,
+    reporting each course's distance (`depth`), limited by `?depth=`.
+    """
+    mode = request.query_params.get("mode", "direct")
+    if mode not in ("direct", "transitive"):
+        return Response({"error": "mode must be 'direct' or 'transitive'"}, status=400)
+    try:
+        max_depth = min(int(request.query_params.get("depth", MAX_PREREQ_DEPTH)), MAX_PREREQ_DEPTH)
+    except ValueError:
+        return Response({"error": "depth must be an integer"}, status=400)
+    if max_depth < 0:
+        return Response({"error": "depth must be non-negative"}, status=400)
+    if mode == "direct":
+        max_depth = 1
+
+    catalog = get_catalog()
+    if course_id not in catalog.by_id:
+        return Response({"error": "course not found"}, status=404)
+
+    depths, truncated = get_prereq_graph().unlocks(course_id, max_depth)
+    depths.pop(course_id)
+    data = []
+    for cid, depth in sorted(depths.items(), key=lambda kv: (kv[1], kv[0])):
+        row = _project(catalog.by_id[cid], SUMMARY_FIELDS)
+        row["depth"] = depth
+        data.append(row)
+    return Response({
+        "course_id": course_id,
+        "mode": mode,
+        "truncated": truncated if mode == "transitive" else False,
+        "courses": data,
+    })
+
+
 @api_view(["POST"])
 def courses_by_labels(request):
     labels = request.data.get("labels", [])
     if not labels:
         return Response({"courses": []})
-        
-    subjects = {s.id: s.code for s in Subject.objects.all()}
-    courses = Course.objects.all()
-    
-    course_by_label = {}
-    for c in courses:
-        code = subjects.get(c.subject_area_id, "")
-        label = f"{code} {c.number}".strip().upper()
-        label = re.sub(r'\s+', ' ', label)
-        course_by_label[label] = {
-            "id": c.id,
-            "subject_area_id": c.subject_area_id,
-            "subject_code": code,
-            "number": c.number,
-            "title": c.title,
-            "description": c.description,
-            "units": c.units,
-            "requisites_text": c.requisites_text,
-            "requisites_parsed": c.requisites_parsed,
-        }
-        
+    try:
+        fields = _course_fields(request, DETAIL_FIELDS)
+    except ValueError as ex:
+        return Response({"error": str(ex)}, status=400)
+
+    by_label = resolve_labels(labels)
     matched = []
     for l in labels:
         if not l: continue
-        l_norm = re.sub(r'\s+', ' ', str(l).strip().upper())
-        if l_norm in course_by_label:
-            matched.append(course_by_label[l_norm])
+        record = by_label.get(normalize_label(l))
+        if record is not None:
+            matched.append(_project(record, fields))
             
     return Response({"courses": matched})
 
+def _wants_raw(request):
+    return request.GET.get("raw", "").lower() in ("1", "true")
+
+
+def _grades_version(course_ids, raw):
+    """Cheap version of what a grades response is built from: rollups, plus raw rows if asked."""
+    version = [tuple(GradeRollup.objects.filter(course_id__in=course_ids).aggregate(
+        rows=Count("id"), refreshed_at=Max("refreshed_at"),
+    ).values())]
+    if raw:
+        version.append(tuple(GradeDistribution.objects.filter(course_id__in=course_ids).aggregate(
+            rows=Count("id"), last_id=Max("id"),
+        ).values()))
+    return version
+
+
+def _raw_grade_rows(course_ids):
+    return GradeDistribution.objects.filter(course_id__in=course_ids).values(
+        "course_id", "term", "instructor", "grades_json", "total_enrolled",
+    )
+
+
+def _grades_etag(request, course_id=None):
+    return make_etag(request.get_full_path(), _grades_version([course_id], _wants_raw(request)))
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_grades_etag)
 @api_view(["GET"])
 def course_grades(request, course_id=None):
+    """
+    Precomputed grade rollup of one course: the course-wide summary plus one
+    per instructor. `?raw=1` also returns the raw grade_distributions rows
+    under `grades`.
+    """
     if not course_id:
         return Response({"error": "course_id is required"}, status=400)
-    
-    distributions = GradeDistribution.objects.filter(course_id=course_id)
-    
-    data = []
-    for d in distributions:
-        data.append({
-            "term": d.term,
-            "instructor": d.instructor,
-            "grades_json": d.grades_json,
-            "total_enrolled": d.total_enrolled
-        })
 
-    return Response({"grades": data})
\ No newline at end of file
+    summary = summarize_courses([course_id], instructors=True)[course_id]
+    data = {"course_id": course_id, "summary": summary, "instructors": summary.pop("instructors")}
+
+    if _wants_raw(request):
+        data["grades"] = [
+            {k: v for k, v in row.items() if k != "course_id"}
+            for row in _raw_grade_rows([course_id])
+        ]
+
+    return Response(data)
+
+
+def _parse_grade_ids(request):
+    # Also called from the etag function, which sees the plain Django request.
+    ids_param = request.GET.get("ids", "")
+    try:
+        ids = list(dict.fromkeys(int(x) for x in ids_param.split(",") if x.strip()))
+    except ValueError:
+        raise ValueError("ids must be comma-separated integers")
+    if len(ids) > MAX_GRADE_BATCH:
+        raise ValueError(f"at most {MAX_GRADE_BATCH} ids per request")
+    return ids
+
+
+def _grades_batch_etag(request):
+    try:
+        ids = _parse_grade_ids(request)
+    except ValueError:
+        return None
+    return make_etag(request.get_full_path(), _grades_version(ids, _wants_raw(request)))
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_grades_batch_etag)
+@api_view(["GET"])
+def course_grades_batch(request):
+    """
+    Grade summaries for many courses: `?ids=1,2,3` (at most 200).
+
+    Each course gets its precomputed rollup: mean GPA, per-grade and per-letter
+    shares, graded and enrolled totals and per-term counts. `?raw=1` also
+    returns the underlying grade_distributions rows.
+    """
+    try:
+        ids = _parse_grade_ids(request)
+    except ValueError as ex:
+        return Response({"error": str(ex)}, status=400)
+    if not ids:
+        return Response({"grades": {}})
+
+    summaries = summarize_courses(ids)
+
+    if _wants_raw(request):
+        for summary in summaries.values():
+            summary["rows"] = []
+        for row in _raw_grade_rows(ids):
+            summaries[row.pop("course_id")]["rows"].append(row)
+
+    return Response({"grades": summaries})
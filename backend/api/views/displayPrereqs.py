@@ -1,26 +1,24 @@
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from api.models import DisplayPrereqs
-
-
-def extract_course_ids(obj):
-
-    ids = set()
-
-    if isinstance(obj, dict):
-        if "course" in obj:
-            ids.add(obj["course"])
-
-        for key in ("all_of", "any_of"):
-            if key in obj and isinstance(obj[key], list):
-                for item in obj[key]:
-                    ids.update(extract_course_ids(item))
-
-    elif isinstance(obj, list):
-        for item in obj:
-            ids.update(extract_course_ids(item))
-
-    return ids
+from api.services.catalog import get_catalog
+from api.services.prereqs import compile_requisites, get_prereq_graph
+
+
+def extract_course_ids(course):
+    """
+    Prerequisite course ids of a `courses` row: its edges in the catalog's
+    prerequisite graph, or, when the row changed after the snapshot was
+    loaded, its requisites compiled against the catalog. Either way ids,
+    string ids and registrar subject/number labels all resolve.
+    """
+    catalog = get_catalog()
+    graph = get_prereq_graph(catalog)
+    record = catalog.by_id.get(course.id)
+    if record is not None and record["updated_at"] == course.updated_at:
+        return graph.prereqs(course.id)
+    program = compile_requisites(course.requisites_parsed, graph.resolve)
+    return sorted({op for op in program if op >= 0})
 
 
 def course_prereqs(request, course_id):
@@ -28,7 +26,7 @@ def course_prereqs(request, course_id):
 
     parsed = course.requisites_parsed or {}
 
-    prereq_ids = list(extract_course_ids(parsed))
+    prereq_ids = list(extract_course_ids(course))
 
     return JsonResponse({
         "course_id": course_id,
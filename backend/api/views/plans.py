@@ -2,10 +2,24 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 import uuid
-from django.db import IntegrityError
-
-
-from api.models import Plan, UserProfile, PlanItem, Course, Subject
+from collections import Counter, defaultdict
+from django.db import IntegrityError, connection, transaction
+
+
+from api.models import Course, Plan, UserProfile, PlanItem
+from api.services.autofill import (
+    DEFAULT_BUDGET_MS, DEFAULT_TERMS, DEFAULT_UNIT_CAP, DEFAULT_YEARS, MAX_BUDGET_MS, autofill, open_cells,
+)
+from api.services.catalog import SUMMARY_FIELDS, get_catalog, normalize_label, parse_units, resolve_labels
+from api.services.fields import parse_fields
+from api.services.ordering import (
+    MAX_INLINE_KEY_LENGTH, cell_key, keys_after, maybe_rebalance, placement_key, spread_keys,
+)
+from api.services.planning import (
+    CHECK_FIELDS, MAX_YEAR_INDEX, TERM_ORDER, plan_violations, requirement_blocks, taken_course_ids, violation_changes,
+)
+from api.services.prereqs import get_prereq_graph
+from api.services.requirements import plan_requirements
 
 def _debug_auth(request):
     print("=== AUTH DEBUG ===")
@@ -29,6 +43,114 @@ def _get_user_uuid(request):
     except ValueError:
         return "invalid"
 
+MAX_BATCH_OPS = 500
+
+# Copies every item of one plan into another in a single statement.
+CLONE_ITEMS_SQL = f"""
+INSERT INTO {PlanItem._meta.db_table}
+       (plan_id, year_index, term, course_id, status, position, sort_key, notes, created_at)
+SELECT %s, year_index, term, course_id, status, position, sort_key, notes, now()
+  FROM {PlanItem._meta.db_table}
+ WHERE plan_id = %s
+"""
+
+PLAN_FIELDS = ("id", "user_id", "name", "start_year", "created_at", "updated_at")
+# Per-plan aggregates the plan list adds to PLAN_FIELDS.
+PLAN_SUMMARY_FIELDS = ("item_count", "planned_units", "completed_units", "last_term")
+
+# Plans of one user with their item aggregates, in one pass over plan_items
+# joined to the courses' units (leading number of e.g. "4.0"). Dropped items
+# are not counted; enrolled ones count as planned. The last column is the
+# latest planning.slot() used.
+PLAN_LIST_SQL = f"""
+SELECT p.id, p.user_id, p.name, p.start_year, p.created_at, p.updated_at,
+       count(i.id) FILTER (WHERE i.status <> 'dropped'),
+       coalesce(sum(substring(c.units from '^\\s*([0-9]+(\\.[0-9]+)?)')::numeric)
+                FILTER (WHERE i.status IN ('planned', 'enrolled')), 0),
+       coalesce(sum(substring(c.units from '^\\s*([0-9]+(\\.[0-9]+)?)')::numeric)
+                FILTER (WHERE i.status = 'completed'), 0),
+       max(i.year_index * 10 + CASE i.term {" ".join(f"WHEN '{t}' THEN {n}" for t, n in TERM_ORDER.items())} ELSE 0 END)
+           FILTER (WHERE i.status <> 'dropped')
+  FROM {Plan._meta.db_table} p
+  LEFT JOIN {PlanItem._meta.db_table} i ON i.plan_id = p.id
+  LEFT JOIN {Course._meta.db_table} c ON c.id = i.course_id
+ WHERE p.user_id = %s
+ GROUP BY p.id
+ ORDER BY p.updated_at DESC, p.created_at DESC
+"""
+ITEM_FIELDS = (
+    "id", "plan_id", "year_index", "term", "course_id",
+    "status", "position", "sort_key", "notes", "created_at",
+)
+
+
+def _serialize_plan(p):
+    return {
+        "id": p.id,
+        "user_id": str(p.user_id),
+        "name": p.name,
+        "start_year": p.start_year,
+        "created_at": p.created_at,
+        "updated_at": p.updated_at,
+    }
+
+
+def _serialize_item(it):
+    return {f: getattr(it, f) for f in ITEM_FIELDS}
+
+
+def _item_values(data, partial):
+    """
+    Validated plan item fields from a request body. With `partial` only the
+    keys present are checked and returned. Returns (values, error message).
+    """
+    values = {}
+    if "year_index" in data or not partial:
+        year_index = data.get("year_index")
+        if not isinstance(year_index, int) or year_index < 0:
+            return None, "year_index must be a non-negative integer"
+        values["year_index"] = year_index
+
+    if "term" in data or not partial:
+        if data.get("term") not in dict(PlanItem.Term.choices):
+            return None, f"term must be one of {list(dict(PlanItem.Term.choices).keys())}"
+        values["term"] = data["term"]
+
+    if "course_id" in data or not partial:
+        course_id = data.get("course_id")
+        if not isinstance(course_id, int) or course_id <= 0:
+            return None, "course_id must be a positive integer"
+        values["course_id"] = course_id
+
+    if "status" in data:
+        if data["status"] not in dict(PlanItem.Status.choices):
+            return None, f"status must be one of {list(dict(PlanItem.Status.choices).keys())}"
+        values["status"] = data["status"]
+
+    if "position" in data:
+        if not isinstance(data["position"], int):
+            return None, "position must be an integer"
+        values["position"] = data["position"]
+
+    if "notes" in data:
+        if data["notes"] is not None and not isinstance(data["notes"], str):
+            return None, "notes must be a string or null"
+        values["notes"] = data["notes"]
+
+    return values, None
+
+
+def _neighbour_ids(data):
+    """`after_id` / `before_id` of a placement request. Returns (after_id, before_id, error message)."""
+    ids = []
+    for key in ("after_id", "before_id"):
+        value = data.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            return None, None, f"{key} must be an item id"
+        ids.append(value)
+    return ids[0], ids[1], None
+
+
 def _resolve_plan_user_id(request):
     user_uuid = _get_user_uuid(request)
     if user_uuid is None:
@@ -42,6 +164,114 @@ def _resolve_plan_user_id(request):
 
     return user_uuid, None
 
+SEED_TERMS = {
+    "FA": PlanItem.Term.FALL,
+    "WI": PlanItem.Term.WINTER,
+    "SP": PlanItem.Term.SPRING,
+    "SU": PlanItem.Term.SUMMER_C,
+}
+
+
+def _seed_from_classes_taken(plan, classes_taken):
+    """
+    Adds a completed item for every classes_taken entry ({"course", "quarter"})
+    since the student started: labels are resolved in one query and the items
+    inserted with one bulk_create. Sets plan.start_year to the academic year
+    of the earliest Fall quarter (pre-UCLA transfer/AP credits are ignored).
+
+    Returns (items seeded, [{"course", "quarter", "reason"}] skipped).
+    """
+    if not classes_taken or not isinstance(classes_taken, list):
+        return 0, []
+
+    parsed_classes = []
+    skipped = []
+    for cls_obj in classes_taken:
+        if not isinstance(cls_obj, dict):
+            continue
+        course_name = cls_obj.get("course")
+        quarter = cls_obj.get("quarter")
+        if not course_name or not quarter or len(quarter) < 4:
+            skipped.append({"course": course_name, "quarter": quarter, "reason": "missing course or quarter"})
+            continue
+
+        term_code = quarter[:2].upper()
+        try:
+            year_val = int(quarter[2:]) + 2000
+        except ValueError:
+            skipped.append({"course": course_name, "quarter": quarter, "reason": "unparsable quarter"})
+            continue
+
+        if term_code in ["WI", "SP", "SU"]:
+            acad_year = year_val - 1
+        else:
+            acad_year = year_val
+
+        parsed_classes.append({
+            "course_name": course_name,
+            "quarter": quarter,
+            "term_code": term_code,
+            "acad_year": acad_year
+        })
+
+    # Determine start year from the earliest Fall quarter
+    # (when the student actually started at UCLA).
+    fall_years = [c["acad_year"] for c in parsed_classes if c["term_code"] == "FA"]
+    if fall_years:
+        min_acad_year = min(fall_years)
+    elif parsed_classes:
+        min_acad_year = min(c["acad_year"] for c in parsed_classes)
+    else:
+        return 0, skipped
+
+    by_label = resolve_labels(c["course_name"] for c in parsed_classes)
+
+    items = {}
+    positions = defaultdict(int)
+    for p_cls in parsed_classes:
+        y_index = p_cls["acad_year"] - min_acad_year + 1
+        if y_index < 1:
+            # Before the student started at UCLA.
+            skipped.append({"course": p_cls["course_name"], "quarter": p_cls["quarter"], "reason": "before start year"})
+            continue
+        t = SEED_TERMS.get(p_cls["term_code"])
+        # Skip items that would violate the DB check constraint
+        if not t or y_index > MAX_YEAR_INDEX:
+            skipped.append({"course": p_cls["course_name"], "quarter": p_cls["quarter"], "reason": "outside plan"})
+            continue
+
+        course = by_label.get(normalize_label(p_cls["course_name"]))
+        if course is None:
+            skipped.append({"course": p_cls["course_name"], "quarter": p_cls["quarter"], "reason": "unknown course"})
+            continue
+
+        key = (y_index, t, course["id"])
+        if key in items:
+            continue
+        cell = (y_index, t)
+        items[key] = PlanItem(
+            plan_id=plan.id,
+            year_index=y_index,
+            term=t,
+            course_id=course["id"],
+            status=PlanItem.Status.COMPLETED,
+            position=positions[cell],
+        )
+        positions[cell] += 1
+
+    # positions[cell] ends as the number of items seeded into the cell.
+    sort_keys = {cell: keys_after(None, n) for cell, n in positions.items()}
+    for it in items.values():
+        it.sort_key = sort_keys[(it.year_index, it.term)][it.position]
+
+    # Set even when no course resolves: the quarters still date the student's start.
+    plan.start_year = min_acad_year
+    plan.save(update_fields=["start_year", "updated_at"])
+    if items:
+        PlanItem.objects.bulk_create(items.values(), ignore_conflicts=True)
+    return len(items), skipped
+
+
 @api_view(["GET", "POST"])
 def plans_view(request):
     _debug_auth(request)
@@ -51,19 +281,32 @@ def plans_view(request):
         return err
 
     if request.method == "GET":
-        qs = Plan.objects.filter(user_id=plan_user_id).order_by("-updated_at", "-created_at")
-        data = [
-            {
-                "id": p.id,
-                "user_id": str(p.user_id),
-                "name": p.name,
-                "start_year": p.start_year,
-                "created_at": p.created_at,
-                "updated_at": p.updated_at,
-            }
-            for p in qs
-        ]
-        return Response({"plans": data})
+        allowed = PLAN_FIELDS + PLAN_SUMMARY_FIELDS
+        try:
+            fields = parse_fields(request.query_params.get("fields"), allowed, allowed)
+        except ValueError as ex:
+            return Response({"error": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with connection.cursor() as cursor:
+            cursor.execute(PLAN_LIST_SQL, [plan_user_id])
+            rows = cursor.fetchall()
+
+        slot_terms = {n: t for t, n in TERM_ORDER.items()}
+        plans = []
+        for row in rows:
+            last_slot = row[9]
+            values = dict(zip(PLAN_FIELDS, row[:6]))
+            values.update({
+                "item_count": row[6],
+                "planned_units": float(row[7]),
+                "completed_units": float(row[8]),
+                "last_term": (
+                    {"year_index": last_slot // 10, "term": slot_terms.get(last_slot % 10)}
+                    if last_slot is not None else None
+                ),
+            })
+            plans.append({f: values[f] for f in fields})
+        return Response({"plans": plans})
 
     name = request.data.get("name")
     start_year = request.data.get("start_year", None)
@@ -71,120 +314,22 @@ def plans_view(request):
     if not name or not isinstance(name, str) or not name.strip():
         return Response({"error": "name is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    p = Plan.objects.create(
-        user_id=plan_user_id,
-        name=name.strip(),
-        start_year=start_year,
-    )
+    user_profile = UserProfile.objects.only("classes_taken").filter(id=plan_user_id).first()
+    classes_taken = user_profile.classes_taken if user_profile else None
 
-    # Auto-populate from classes_taken
-    user_profile = UserProfile.objects.filter(id=plan_user_id).first()
-    if user_profile and user_profile.classes_taken and isinstance(user_profile.classes_taken, list):
-        parsed_classes = []
-        for cls_obj in user_profile.classes_taken:
-            course_name = cls_obj.get("course")
-            quarter = cls_obj.get("quarter")
-            if not course_name or not quarter or len(quarter) < 4:
-                continue
-                
-            term_code = quarter[:2].upper()
-            try:
-                year_val = int(quarter[2:]) + 2000
-            except ValueError:
-                continue
-                
-            if term_code in ["WI", "SP", "SU"]:
-                acad_year = year_val - 1
-            else:
-                acad_year = year_val
-                
-            parsed_classes.append({
-                "course_name": course_name,
-                "term_code": term_code,
-                "acad_year": acad_year
-            })
-
-        # Determine start year from the earliest Fall quarter
-        # (when the student actually started at UCLA).
-        # Pre-UCLA transfer/AP credits are ignored.
-        fall_years = [c["acad_year"] for c in parsed_classes if c["term_code"] == "FA"]
-        if fall_years:
-            min_acad_year = min(fall_years)
-        elif parsed_classes:
-            min_acad_year = min(c["acad_year"] for c in parsed_classes)
-        else:
-            min_acad_year = None
-
-        # Filter out courses from before the student started at UCLA
-        parsed_classes = [c for c in parsed_classes if c["acad_year"] >= min_acad_year] if min_acad_year else []
-            
-        if parsed_classes and min_acad_year:
-            p.start_year = min_acad_year
-            p.save()
-            
-            term_map = {
-                "FA": PlanItem.Term.FALL,
-                "WI": PlanItem.Term.WINTER,
-                "SP": PlanItem.Term.SPRING,
-                "SU": PlanItem.Term.SUMMER_C,
-            }
-            
-            from collections import defaultdict
-            positions = defaultdict(int)
-
-            MAX_YEAR_INDEX = 5  # DB check constraint limits year_index to 1-5
-            
-            for p_cls in parsed_classes:
-                y_index = p_cls["acad_year"] - min_acad_year + 1
-                t = term_map.get(p_cls["term_code"])
-                if not t:
-                    continue
-
-                # Skip items that would violate the DB check constraint
-                if y_index < 1 or y_index > MAX_YEAR_INDEX:
-                    continue
-                    
-                c_parts = p_cls["course_name"].rsplit(" ", 1)
-                if len(c_parts) != 2:
-                    continue
-                    
-                sub_code, num = c_parts[0], c_parts[1]
-                
-                subject = Subject.objects.filter(code__iexact=sub_code).first()
-                if not subject:
-                    continue
-                    
-                course = Course.objects.filter(subject_area_id=subject.id, number__iexact=num).first()
-                if not course:
-                    continue
-                    
-                pos_key = (y_index, t)
-                pos = positions[pos_key]
-                positions[pos_key] += 1
-                
-                try:
-                    PlanItem.objects.create(
-                        plan_id=p.id,
-                        year_index=y_index,
-                        term=t,
-                        course_id=course.id,
-                        status=PlanItem.Status.COMPLETED,
-                        position=pos
-                    )
-                except IntegrityError:
-                    continue
+    with transaction.atomic():
+        p = Plan.objects.create(
+            user_id=plan_user_id,
+            name=name.strip(),
+            start_year=start_year,
+        )
+        # Auto-populate from classes_taken
+        seeded, skipped = _seed_from_classes_taken(p, classes_taken)
 
     return Response(
-        {
-            "id": p.id,
-            "user_id": str(p.user_id),
-            "name": p.name,
-            "start_year": p.start_year,
-            "created_at": p.created_at,
-            "updated_at": p.updated_at,
-        },
+        {**_serialize_plan(p), "seeded_items": seeded, "skipped_labels": skipped},
         status=status.HTTP_201_CREATED,
-        )
+    )
 
 
 @api_view(["GET", "POST"])
@@ -200,65 +345,40 @@ def plan_items_view(request, plan_id: int):
         return Response({"error": "plan not found (or not yours)"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
-        qs = PlanItem.objects.filter(plan_id=plan.id).order_by("year_index", "term", "position", "id")
-        data = [
-            {
-                "id": it.id,
-                "plan_id": it.plan_id,
-                "year_index": it.year_index,
-                "term": it.term,
-                "course_id": it.course_id,
-                "status": it.status,
-                "position": it.position,
-                "notes": it.notes,
-                "created_at": it.created_at,
-            }
-            for it in qs
-        ]
-        return Response({"items": data})
+        try:
+            fields = parse_fields(request.query_params.get("fields"), ITEM_FIELDS, ITEM_FIELDS)
+        except ValueError as ex:
+            return Response({"error": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+
+        qs = PlanItem.objects.filter(plan_id=plan.id).order_by("year_index", "term", "sort_key", "position", "id")
+        return Response({"items": list(qs.values(*fields))})
 
     if request.method == "POST":     
         # POST create
-        year_index = request.data.get("year_index")
-        term = request.data.get("term")
-        course_id = request.data.get("course_id")
-
-        if not isinstance(year_index, int) or year_index < 0:
-            return Response({"error": "year_index must be a non-negative integer"}, status=status.HTTP_400_BAD_REQUEST)
-
-        if term not in dict(PlanItem.Term.choices):
-            return Response(
-                {"error": f"term must be one of {list(dict(PlanItem.Term.choices).keys())}"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if not isinstance(course_id, int) or course_id <= 0:
-            return Response({"error": "course_id must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
-
-        status_value = request.data.get("status", PlanItem.Status.PLANNED)
-        if status_value not in dict(PlanItem.Status.choices):
-            return Response(
-                {"error": f"status must be one of {list(dict(PlanItem.Status.choices).keys())}"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        position = request.data.get("position", 0)
-        if not isinstance(position, int):
-            return Response({"error": "position must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
-
-        notes = request.data.get("notes", None)
-        if notes is not None and not isinstance(notes, str):
-            return Response({"error": "notes must be a string or null"}, status=status.HTTP_400_BAD_REQUEST)
+        values, error = _item_values(request.data, partial=False)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        year_index, term = values["year_index"], values["term"]
+
+        # Goes at the end of the cell unless after_id / before_id place it.
+        after_id, before_id, error = _neighbour_ids(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            sort_key = placement_key(plan.id, year_index, term, after_id, before_id)
+        except ValueError as ex:
+            return Response({"error": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             it = PlanItem.objects.create(
                 plan_id=plan.id,         # important: use plan.id, not user_id
                 year_index=year_index,
                 term=term,
-                course_id=course_id,
-                status=status_value,
-                position=position,
-                notes=notes,
+                course_id=values["course_id"],
+                status=values.get("status", PlanItem.Status.PLANNED),
+                position=values.get("position", 0),
+                sort_key=sort_key,
+                notes=values.get("notes"),
                 # created_at: relies on DB default; if your DB doesn't default it, you'll need to set it explicitly
             )
         except IntegrityError as ex:
@@ -268,20 +388,8 @@ def plan_items_view(request, plan_id: int):
                 status=status.HTTP_409_CONFLICT,
             )
 
-        return Response(
-            {
-                "id": it.id,
-                "plan_id": it.plan_id,
-                "year_index": it.year_index,
-                "term": it.term,
-                "course_id": it.course_id,
-                "status": it.status,
-                "position": it.position,
-                "notes": it.notes,
-                "created_at": it.created_at,
-            },
-            status=status.HTTP_201_CREATED,
-        )
+        maybe_rebalance(plan.id, year_index, term, sort_key)
+        return Response(_serialize_item(it), status=status.HTTP_201_CREATED)
     
 
 @api_view(["PUT", "PATCH", "DELETE"])
@@ -302,31 +410,30 @@ def plan_item_detail_view(request, plan_id: int, item_id: int):
 
     if request.method in ("PUT", "PATCH"):
         data = request.data
+        cell = (item.year_index, item.term)
+
+        # The course of an item is fixed; a course_id in the body is ignored.
+        values, error = _item_values({k: v for k, v in data.items() if k != "course_id"}, partial=True)
+        if error:
+            return Response({"error": error}, status=400)
+        for field, value in values.items():
+            setattr(item, field, value)
+
+        # A move into another cell, or next to given neighbours, only rewrites this row's sort_key.
+        after_id, before_id, error = _neighbour_ids(data)
+        if error:
+            return Response({"error": error}, status=400)
+        if after_id is not None or before_id is not None or (item.year_index, item.term) != cell:
+            try:
+                item.sort_key = placement_key(
+                    plan.id, item.year_index, item.term, after_id, before_id, exclude_id=item.id,
+                )
+            except ValueError as ex:
+                return Response({"error": str(ex)}, status=400)
 
-        if "year_index" in data:
-            if not isinstance(data["year_index"], int) or data["year_index"] < 0:
-                return Response({"error": "invalid year_index"}, status=400)
-            item.year_index = data["year_index"]
-
-        if "term" in data:
-            if data["term"] not in dict(PlanItem.Term.choices):
-                return Response({"error": "invalid term"}, status=400)
-            item.term = data["term"]
-
-        if "status" in data:
-            if data["status"] not in dict(PlanItem.Status.choices):
-                return Response({"error": "invalid status"}, status=400)
-            item.status = data["status"]
-
-        if "position" in data:
-            if not isinstance(data["position"], int):
-                return Response({"error": "invalid position"}, status=400)
-            item.position = data["position"]
-
-        if "notes" in data:
-            if data["notes"] is not None and not isinstance(data["notes"], str):
-                return Response({"error": "invalid notes"}, status=400)
-            item.notes = data["notes"]
+        # Re-check only what the move can affect; one query for the plan's items.
+        moved = any(f in data for f in ("year_index", "term", "status"))
+        before = list(PlanItem.objects.filter(plan_id=plan.id).values(*CHECK_FIELDS)) if moved else []
 
         try:
             item.save()
@@ -336,19 +443,17 @@ def plan_item_detail_view(request, plan_id: int, item_id: int):
                 status=409,
             )
 
-        return Response(
-            {
-                "id": item.id,
-                "plan_id": item.plan_id,
-                "year_index": item.year_index,
-                "term": item.term,
-                "course_id": item.course_id,
-                "status": item.status,
-                "position": item.position,
-                "notes": item.notes,
-                "created_at": item.created_at,
-            }
-        )
+        changes = {"created": [], "resolved": []}
+        if moved:
+            placed = {f: getattr(item, f) for f in CHECK_FIELDS}
+            after = [placed if it["id"] == item.id else it for it in before]
+            profile = UserProfile.objects.only("classes_taken").get(id=plan_user_id)
+            changes = violation_changes(
+                before, after, item.course_id, get_prereq_graph(), taken_course_ids(profile.classes_taken),
+            )
+
+        maybe_rebalance(plan.id, item.year_index, item.term, item.sort_key)
+        return Response({**_serialize_item(item), "prereq_violations": changes})
 
     if request.method == "DELETE":
         item.delete()
@@ -382,15 +487,389 @@ def plan_detail_view(request, plan_id: int):
 
         plan.save()
 
-        return Response({
-            "id": plan.id,
-            "user_id": str(plan.user_id),
-            "name": plan.name,
-            "start_year": plan.start_year,
-            "created_at": plan.created_at,
-            "updated_at": plan.updated_at,
-        })
+        return Response(_serialize_plan(plan))
 
     if request.method == "DELETE":
         plan.delete()
-        return Response(status=204)
\ No newline at end of file
+        return Response(status=204)
+
+
+@api_view(["GET"])
+def plan_validate_view(request, plan_id: int):
+    """
+    Checks every item of the plan against the prerequisite graph and lists
+    the ones scheduled before (or in the same term as) their requisites.
+    The user's classes_taken count as done before the first term.
+    """
+    _debug_auth(request)
+
+    plan_user_id, err = _resolve_plan_user_id(request)
+    if err:
+        return err
+
+    plan = Plan.objects.filter(id=plan_id, user_id=plan_user_id).first()
+    if not plan:
+        return Response({"error": "plan not found (or not yours)"}, status=404)
+
+    items = list(PlanItem.objects.filter(plan_id=plan.id).values(*CHECK_FIELDS))
+    profile = UserProfile.objects.only("classes_taken").get(id=plan_user_id)
+    violations = plan_violations(items, get_prereq_graph(), taken_course_ids(profile.classes_taken))
+    return Response({
+        "plan_id": plan.id,
+        "valid": not violations,
+        "violations": violations,
+    })
+
+
+@api_view(["POST"])
+def plan_autofill_view(request, plan_id: int):
+    """
+    Drafts the rest of the plan from the user's classes_needed.
+
+    Body (all optional): `years` (default 4), `terms` (default FALL, WINTER,
+    SPRING), `max_units` per term (default 16) with per-term overrides in
+    `unit_caps` ({"SUMMER_C": 8}), `time_budget_ms` (default 300, max 2000)
+    and `dry_run` to only return the proposal. Existing items are kept; new
+    items go into the terms after the last completed or enrolled one.
+    """
+    _debug_auth(request)
+
+    plan_user_id, err = _resolve_plan_user_id(request)
+    if err:
+        return err
+
+    plan = Plan.objects.filter(id=plan_id, user_id=plan_user_id).first()
+    if not plan:
+        return Response({"error": "plan not found (or not yours)"}, status=404)
+
+    data = request.data
+    years = data.get("years", DEFAULT_YEARS)
+    if not isinstance(years, int) or isinstance(years, bool) or not 1 <= years <= MAX_YEAR_INDEX:
+        return Response({"error": f"years must be an integer from 1 to {MAX_YEAR_INDEX}"}, status=400)
+
+    term_choices = dict(PlanItem.Term.choices)
+    terms = data.get("terms", list(DEFAULT_TERMS))
+    if not isinstance(terms, list) or not terms or any(not isinstance(t, str) or t not in term_choices for t in terms):
+        return Response({"error": f"terms must be a non-empty list of {list(term_choices)}"}, status=400)
+
+    max_units = data.get("max_units", DEFAULT_UNIT_CAP)
+    overrides = data.get("unit_caps") or {}
+    if not isinstance(overrides, dict):
+        return Response({"error": "unit_caps must be an object keyed by term"}, status=400)
+    for value in [max_units, *overrides.values()]:
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+            return Response({"error": "unit caps must be positive numbers"}, status=400)
+    if any(t not in term_choices for t in overrides):
+        return Response({"error": f"unit_caps keys must be in {list(term_choices)}"}, status=400)
+    unit_caps = {t: overrides.get(t, max_units) for t in term_choices}
+
+    budget_ms = data.get("time_budget_ms", DEFAULT_BUDGET_MS)
+    if not isinstance(budget_ms, int) or isinstance(budget_ms, bool) or budget_ms <= 0:
+        return Response({"error": "time_budget_ms must be a positive integer"}, status=400)
+    budget_ms = min(budget_ms, MAX_BUDGET_MS)
+    dry_run = data.get("dry_run", False)
+    if not isinstance(dry_run, bool):
+        return Response({"error": "dry_run must be a boolean"}, status=400)
+
+    profile = UserProfile.objects.only("classes_taken", "classes_needed").get(id=plan_user_id)
+    items = list(PlanItem.objects.filter(plan_id=plan.id).values(*CHECK_FIELDS, "position", "sort_key"))
+    catalog = get_catalog()
+    blocks = requirement_blocks(profile.classes_needed, catalog)
+
+    result = autofill(
+        items, taken_course_ids(profile.classes_taken), blocks, get_prereq_graph(), catalog,
+        open_cells(items, years, terms), unit_caps, budget_ms=budget_ms, seed=plan.id,
+    )
+
+    positions = {}
+    sort_keys = {}
+    for it in items:
+        cell = (it["year_index"], it["term"])
+        positions[cell] = max(positions.get(cell, -1), it["position"])
+        if it["sort_key"] and it["sort_key"] > sort_keys.get(cell, ""):
+            sort_keys[cell] = it["sort_key"]
+    placed = Counter((year_index, term) for year_index, term, _ in result["placements"])
+    new_keys = {cell: iter(keys_after(sort_keys.get(cell), n)) for cell, n in placed.items()}
+    new_items = []
+    for year_index, term, course_id in result["placements"]:
+        cell = (year_index, term)
+        positions[cell] = positions.get(cell, -1) + 1
+        new_items.append(PlanItem(
+            plan_id=plan.id, year_index=year_index, term=term, course_id=course_id,
+            status=PlanItem.Status.PLANNED, position=positions[cell], sort_key=next(new_keys[cell]),
+        ))
+    if new_items and not dry_run:
+        try:
+            with transaction.atomic():
+                new_items = PlanItem.objects.bulk_create(new_items)
+                plan.save(update_fields=["updated_at"])
+        except IntegrityError as ex:
+            # e.g. an item added to one of the cells since the plan was read
+            return Response({"error": "could not add the proposed items", "detail": str(ex)}, status=409)
+
+    return Response({
+        "plan_id": plan.id,
+        "dry_run": dry_run,
+        "items": [
+            {f: getattr(it, f) for f in ("year_index", "term", "course_id", "position", "sort_key")}
+            if dry_run else _serialize_item(it)
+            for it in new_items
+        ],
+        "unplaced": result["unplaced"],
+        "unmet": [
+            {"requirement": block["index"], "needs_text": block["needs_text"], "short": short}
+            for block, short in result["unmet"]
+        ],
+        "iterations": result["iterations"],
+        "timed_out": result["timed_out"],
+    }, status=200 if dry_run else 201)
+
+
+@api_view(["GET"])
+def plan_requirements_view(request, plan_id: int):
+    """
+    Which plan items (and classes taken) count toward each classes_needed
+    block, and how many courses each block still needs.
+    """
+    _debug_auth(request)
+
+    plan_user_id, err = _resolve_plan_user_id(request)
+    if err:
+        return err
+
+    plan = Plan.objects.filter(id=plan_id, user_id=plan_user_id).first()
+    if not plan:
+        return Response({"error": "plan not found (or not yours)"}, status=404)
+
+    profile = UserProfile.objects.only("classes_taken", "classes_needed").get(id=plan_user_id)
+    items = list(PlanItem.objects.filter(plan_id=plan.id).values(*CHECK_FIELDS))
+    result = plan_requirements(plan.id, items, profile.classes_taken, profile.classes_needed, get_catalog())
+    return Response({"plan_id": plan.id, **result})
+
+
+@api_view(["POST"])
+def plan_items_batch_view(request, plan_id: int):
+    """
+    Applies a list of item ops in one transaction and returns the plan's
+    items afterwards.
+
+    Body: {"ops": [{"op": "create", "year_index", "term", "course_id", ...},
+    {"op": "move" | "update", "id", <fields to change>}, {"op": "delete",
+    "id"}]}. Ops on the same item apply in order. The whole batch is written
+    with one DELETE, one bulk UPDATE and one bulk INSERT; any invalid op or
+    constraint violation rejects all of it.
+    """
+    _debug_auth(request)
+
+    plan_user_id, err = _resolve_plan_user_id(request)
+    if err:
+        return err
+
+    plan = Plan.objects.filter(id=plan_id, user_id=plan_user_id).first()
+    if not plan:
+        return Response({"error": "plan not found (or not yours)"}, status=status.HTTP_404_NOT_FOUND)
+
+    ops = request.data.get("ops")
+    if not isinstance(ops, list) or not ops:
+        return Response({"error": "ops must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ops) > MAX_BATCH_OPS:
+        return Response({"error": f"at most {MAX_BATCH_OPS} ops per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    items = {it.id: it for it in PlanItem.objects.filter(plan_id=plan.id)}
+    deleted = set()
+    changed = {}      # item id -> fields changed
+    created = []
+
+    def place(item, after_id, before_id):
+        # sort_key from the batch's current state of the target cell.
+        cell = (item.year_index, item.term)
+        others = {("new", n): it for n, it in enumerate(created) if it is not item and (it.year_index, it.term) == cell}
+        others.update(
+            (item_id, it) for item_id, it in items.items()
+            if it is not item and item_id not in deleted and (it.year_index, it.term) == cell
+        )
+        item.sort_key = cell_key({k: it.sort_key for k, it in others.items()}, after_id, before_id)
+        if len(item.sort_key) > MAX_INLINE_KEY_LENGTH:
+            # Too long to store: respread the whole cell, in order, before it is written.
+            ordered = sorted([item, *others.values()], key=lambda it: (it.sort_key is None, it.sort_key or ""))
+            for it, key in zip(ordered, spread_keys(len(ordered))):
+                it.sort_key = key
+                if it.id is not None:
+                    changed.setdefault(it.id, set()).add("sort_key")
+
+    for i, op in enumerate(ops):
+        kind = op.get("op") if isinstance(op, dict) else None
+        after_id, before_id, error = _neighbour_ids(op) if kind else (None, None, None)
+        if error:
+            return Response({"error": f"ops[{i}]: {error}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if kind == "create":
+            values, error = _item_values(op, partial=False)
+            if error:
+                return Response({"error": f"ops[{i}]: {error}"}, status=status.HTTP_400_BAD_REQUEST)
+            item = PlanItem(plan_id=plan.id, **values)
+            try:
+                place(item, after_id, before_id)
+            except ValueError as ex:
+                return Response({"error": f"ops[{i}]: {ex}"}, status=status.HTTP_400_BAD_REQUEST)
+            created.append(item)
+            continue
+
+        if kind not in ("move", "update", "delete"):
+            return Response(
+                {"error": f"ops[{i}]: op must be one of create, move, update, delete"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        item_id = op.get("id")
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            return Response({"error": f"ops[{i}]: id must be an item id"}, status=status.HTTP_400_BAD_REQUEST)
+        item = items.get(item_id)
+        if item is None or item.id in deleted:
+            return Response({"error": f"ops[{i}]: plan item not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if kind == "delete":
+            deleted.add(item.id)
+            changed.pop(item.id, None)
+            continue
+
+        values, error = _item_values(op, partial=True)
+        if error:
+            return Response({"error": f"ops[{i}]: {error}"}, status=status.HTTP_400_BAD_REQUEST)
+        if "course_id" in values:
+            return Response({"error": f"ops[{i}]: course_id cannot be changed"}, status=status.HTTP_400_BAD_REQUEST)
+        cell = (item.year_index, item.term)
+        for field, value in values.items():
+            setattr(item, field, value)
+        if values:
+            changed.setdefault(item.id, set()).update(values)
+        if after_id is not None or before_id is not None or (item.year_index, item.term) != cell:
+            try:
+                place(item, after_id, before_id)
+            except ValueError as ex:
+                return Response({"error": f"ops[{i}]: {ex}"}, status=status.HTTP_400_BAD_REQUEST)
+            changed.setdefault(item.id, set()).add("sort_key")
+
+    try:
+        with transaction.atomic():
+            if deleted:
+                PlanItem.objects.filter(plan_id=plan.id, id__in=deleted).delete()
+            if changed:
+                # Every entry holds at least one field; a bare move / update changes nothing.
+                fields = sorted(set().union(*changed.values()))
+                PlanItem.objects.bulk_update([items[item_id] for item_id in changed], fields)
+            if created:
+                created = PlanItem.objects.bulk_create(created)
+    except IntegrityError as ex:
+        return Response(
+            {"error": "batch failed", "detail": str(ex)},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    final = [it for item_id, it in items.items() if item_id not in deleted] + list(created)
+    # Same order as plan_items_view's ORDER BY (NULL sort keys last, as in Postgres).
+    final.sort(key=lambda it: (it.year_index, it.term, it.sort_key is None, it.sort_key or "", it.position, it.id))
+    longest = {}
+    for it in final:
+        cell = (it.year_index, it.term)
+        if it.sort_key and len(it.sort_key) > len(longest.get(cell, "")):
+            longest[cell] = it.sort_key
+    for (year_index, term), key in longest.items():
+        maybe_rebalance(plan.id, year_index, term, key)
+    return Response({"items": [_serialize_item(it) for it in final]})
+
+
+@api_view(["GET"])
+def plan_full_view(request, plan_id: int):
+    """
+    Everything needed to open a plan in one response: the plan, its items
+    grouped by year and term (in term order), a summary of every referenced
+    course from the catalog snapshot, and unit totals per term, per year and
+    for the plan. Dropped items are listed but not counted.
+    """
+    _debug_auth(request)
+
+    plan_user_id, err = _resolve_plan_user_id(request)
+    if err:
+        return err
+
+    plan = Plan.objects.filter(id=plan_id, user_id=plan_user_id).first()
+    if not plan:
+        return Response({"error": "plan not found (or not yours)"}, status=404)
+
+    items = list(PlanItem.objects.filter(plan_id=plan.id).values(*ITEM_FIELDS))
+    catalog = get_catalog()
+
+    def units_of(course_id):
+        record = catalog.by_id.get(course_id)
+        return (parse_units(record["units"]) if record else None) or 0.0
+
+    cells = {}
+    for it in items:
+        cells.setdefault((it["year_index"], it["term"]), []).append(it)
+
+    years = {}
+    totals = {"total": 0.0, "completed": 0.0, "planned": 0.0}
+    for (year_index, term), cell in sorted(cells.items(), key=lambda kv: (kv[0][0], TERM_ORDER.get(kv[0][1], 0))):
+        # NULL sort keys last, as in plan_items_view's ORDER BY.
+        cell.sort(key=lambda it: (it["sort_key"] is None, it["sort_key"] or "", it["position"], it["id"]))
+        units = 0.0
+        for it in cell:
+            if it["status"] == PlanItem.Status.DROPPED:
+                continue
+            course_units = units_of(it["course_id"])
+            units += course_units
+            totals["total"] += course_units
+            if it["status"] == PlanItem.Status.COMPLETED:
+                totals["completed"] += course_units
+            else:
+                totals["planned"] += course_units
+        year = years.setdefault(year_index, {"year_index": year_index, "units": 0.0, "terms": []})
+        year["terms"].append({"term": term, "units": units, "items": cell})
+        year["units"] += units
+
+    courses = {
+        str(course_id): {f: catalog.by_id[course_id][f] for f in SUMMARY_FIELDS}
+        for course_id in sorted({it["course_id"] for it in items})
+        if course_id in catalog.by_id
+    }
+
+    return Response({
+        "plan": _serialize_plan(plan),
+        "years": list(years.values()),
+        "courses": courses,
+        "units": totals,
+    })
+
+
+@api_view(["POST"])
+def plan_clone_view(request, plan_id: int):
+    """
+    Copies the plan and all of its items for what-if editing. `name` in the
+    body names the copy (default "<name> (copy)", with the original name
+    shortened to fit).
+    """
+    _debug_auth(request)
+
+    plan_user_id, err = _resolve_plan_user_id(request)
+    if err:
+        return err
+
+    plan = Plan.objects.filter(id=plan_id, user_id=plan_user_id).first()
+    if not plan:
+        return Response({"error": "plan not found (or not yours)"}, status=404)
+
+    max_length = Plan._meta.get_field("name").max_length
+    suffix = " (copy)"
+    name = request.data.get("name", plan.name[:max_length - len(suffix)] + suffix)
+    if not isinstance(name, str) or not name.strip():
+        return Response({"error": "invalid name"}, status=400)
+    if len(name.strip()) > max_length:
+        return Response({"error": f"name must be at most {max_length} characters"}, status=400)
+
+    with transaction.atomic():
+        clone = Plan.objects.create(user_id=plan.user_id, name=name.strip(), start_year=plan.start_year)
+        with connection.cursor() as cursor:
+            cursor.execute(CLONE_ITEMS_SQL, [clone.id, plan.id])
+            copied = cursor.rowcount
+
+    return Response({**_serialize_plan(clone), "copied_items": copied}, status=status.HTTP_201_CREATED)
@@ -1,21 +1,25 @@
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from api.models import Subject
+from api.services.catalog import get_catalog
+from api.services.conditional import make_etag
 
 
+def _subjects_etag(request):
+    return make_etag(get_catalog().version, "subjects")
+
+
+def _subjects_last_modified(request):
+    return max((s["updated_at"] for s in get_catalog().subjects if s["updated_at"]), default=None)
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_subjects_etag, last_modified_func=_subjects_last_modified)
 @api_view(["GET"])
 def list_subjects(request):
     if request.method == "GET":
-        subjects = Subject.objects.all().order_by("id")
-        data = []
-        for subject in subjects:
-            data.append({
-                    "id": subject.id,
-                    "code": subject.code,
-                    "name": subject.name,
-                    "created_at": subject.created_at,
-                    "updated_at": subject.updated_at,})
-        
+        data = [dict(subject) for subject in get_catalog().subjects]
         return Response({"subjects": data}) 
     
     
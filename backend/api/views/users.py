@@ -5,6 +5,10 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from api.models.users import UserProfile  # adjust import if your path differs
+from api.services.catalog import COURSE_FIELDS, SUMMARY_FIELDS, get_catalog
+from api.services.fields import parse_fields
+from api.services.planning import taken_course_ids
+from api.services.prereqs import get_prereq_graph
 
 
 from supabase import create_client, Client
@@ -46,22 +50,27 @@ def _get_user_uuid_from_supabase_jwt(request):
         return None, Response({"error": "invalid jwt or invalid jwt format"}, status=401)
 
 
-def _serialize_profile(profile: UserProfile):
-    return {
-        "id": str(profile.id),
-        "name": profile.name,
-        "major": profile.major,
-        "minor": profile.minor,
-        "expected_grad": profile.expected_grad,
-        "year": profile.year,
-        "completed_lower_div_units": profile.completed_lower_div_units,
-        "completed_upper_div_units": profile.completed_upper_div_units,
-        "gpa": profile.gpa,
-        "classes_taken": profile.classes_taken,
-        "classes_needed": profile.classes_needed,
-        "created_at": profile.created_at,
-        "updated_at": profile.updated_at,
-    }
+PROFILE_FIELDS = (
+    "id",
+    "name",
+    "major",
+    "minor",
+    "expected_grad",
+    "year",
+    "completed_lower_div_units",
+    "completed_upper_div_units",
+    "gpa",
+    "classes_taken",
+    "classes_needed",
+    "created_at",
+    "updated_at",
+)
+
+
+def _serialize_profile(profile: UserProfile, fields=PROFILE_FIELDS):
+    data = {f: getattr(profile, f) for f in fields}
+    data["id"] = str(profile.id)
+    return data
 
 
 @api_view(["GET"])
@@ -70,13 +79,21 @@ def get_profile(request):
     if err:
         return err
 
-    # Create profile on first login (so you don't need a createUser endpoint)
-    profile, _created = UserProfile.objects.get_or_create(
-        id=user_uuid,
-        defaults={"created_at": timezone.now()}
-    )
+    try:
+        fields = parse_fields(request.query_params.get("fields"), PROFILE_FIELDS, PROFILE_FIELDS)
+    except ValueError as ex:
+        return Response({"error": str(ex)}, status=400)
 
-    return Response(_serialize_profile(profile), status=200)
+    # Only fetch the requested columns (classes_taken / classes_needed are large JSON)
+    profile = UserProfile.objects.only(*fields).filter(id=user_uuid).first()
+    if profile is None:
+        # Create profile on first login (so you don't need a createUser endpoint)
+        profile, _created = UserProfile.objects.get_or_create(
+            id=user_uuid,
+            defaults={"created_at": timezone.now()}
+        )
+
+    return Response(_serialize_profile(profile, fields), status=200)
 
 
 @api_view(["PATCH", "PUT"])
@@ -109,3 +126,31 @@ def update_profile(request):
     profile.save()
 
     return Response(_serialize_profile(profile), status=200)
+
+
+@api_view(["GET"])
+def eligible_courses(request):
+    """
+    Every course the user can take next: not yet taken, with all requisites
+    met by their classes_taken. Courses without requisites are left out unless
+    `?include_open=1`. `?fields=` picks the course fields.
+    """
+    user_uuid, err = _get_user_uuid_from_supabase_jwt(request)
+    if err:
+        return err
+
+    try:
+        fields = parse_fields(request.query_params.get("fields"), COURSE_FIELDS, SUMMARY_FIELDS)
+    except ValueError as ex:
+        return Response({"error": str(ex)}, status=400)
+    include_open = request.query_params.get("include_open", "").lower() in ("1", "true")
+
+    profile = UserProfile.objects.only("classes_taken").filter(id=user_uuid).first()
+    if profile is None:
+        return Response({"error": "User profile not found"}, status=404)
+
+    taken = taken_course_ids(profile.classes_taken)
+    catalog = get_catalog()
+    eligible = get_prereq_graph().eligible(taken, include_open=include_open)
+    data = [{f: catalog.by_id[cid][f] for f in fields} for cid in eligible]
+    return Response({"taken_count": len(taken), "courses": data})
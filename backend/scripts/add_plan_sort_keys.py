@@ -0,0 +1,50 @@
+import os
+import sys
+import django
+from django.db import connection, transaction
+
+# Add the backend directory to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from api.models import PlanItem
+from api.services.ordering import spread_keys
+
+# Usage:
+#   python scripts/add_plan_sort_keys.py            # add the column, backfill items without a key
+#   python scripts/add_plan_sort_keys.py --all      # also respread every existing key
+
+# "C" collation: keys compare bytewise, as api.services.ordering expects.
+SETUP_SQL = """
+ALTER TABLE plan_items ADD COLUMN IF NOT EXISTS sort_key VARCHAR(64) COLLATE "C";
+DROP INDEX IF EXISTS idx_plan_cell;
+CREATE INDEX idx_plan_cell ON plan_items (plan_id, year_index, term, sort_key);
+"""
+
+def main():
+    print("Ensuring plan_items.sort_key column and idx_plan_cell...")
+    with connection.cursor() as cursor:
+        cursor.execute(SETUP_SQL)
+
+    respread = "--all" in sys.argv[1:]
+    cells = PlanItem.objects.all() if respread else PlanItem.objects.filter(sort_key__isnull=True)
+    cells = cells.values_list("plan_id", "year_index", "term").distinct()
+
+    updated = 0
+    for plan_id, year_index, term in cells.iterator():
+        with transaction.atomic():
+            items = list(
+                PlanItem.objects.select_for_update()
+                .filter(plan_id=plan_id, year_index=year_index, term=term)
+                .order_by("position", "id")
+            )
+            for item, key in zip(items, spread_keys(len(items))):
+                item.sort_key = key
+            PlanItem.objects.bulk_update(items, ["sort_key"])
+        updated += len(items)
+
+    print("Done! Wrote sort keys for", updated, "plan items.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import django
+from django.db import connection
+
+# Add the backend directory to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+# Same normalization as api.services.catalog.normalize_label, in SQL.
+LABEL_EXPR = "upper(regexp_replace(btrim({code} || ' ' || {number}), '\\s+', ' ', 'g'))"
+
+SETUP_SQL = f"""
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS label_key TEXT;
+CREATE INDEX IF NOT EXISTS idx_courses_label_key ON courses (label_key);
+
+CREATE OR REPLACE FUNCTION courses_set_label_key() RETURNS trigger AS $$
+BEGIN
+    SELECT {LABEL_EXPR.format(code="s.code", number="NEW.number")}
+      INTO NEW.label_key
+      FROM subject_areas s
+     WHERE s.id = NEW.subject_area_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_courses_label_key ON courses;
+CREATE TRIGGER trg_courses_label_key
+    BEFORE INSERT OR UPDATE OF subject_area_id, number ON courses
+    FOR EACH ROW EXECUTE FUNCTION courses_set_label_key();
+
+CREATE OR REPLACE FUNCTION subject_areas_refresh_label_keys() RETURNS trigger AS $$
+BEGIN
+    UPDATE courses c
+       SET label_key = {LABEL_EXPR.format(code="NEW.code", number="c.number")}
+     WHERE c.subject_area_id = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_subject_areas_label_keys ON subject_areas;
+CREATE TRIGGER trg_subject_areas_label_keys
+    AFTER UPDATE OF code ON subject_areas
+    FOR EACH ROW EXECUTE FUNCTION subject_areas_refresh_label_keys();
+"""
+
+BACKFILL_SQL = f"""
+UPDATE courses c
+   SET label_key = {LABEL_EXPR.format(code="s.code", number="c.number")}
+  FROM subject_areas s
+ WHERE s.id = c.subject_area_id
+   AND c.label_key IS DISTINCT FROM {LABEL_EXPR.format(code="s.code", number="c.number")};
+"""
+
+
+def main():
+    print("Ensuring courses.label_key column, index and triggers...")
+    with connection.cursor() as cursor:
+        cursor.execute(SETUP_SQL)
+        print("Backfilling label keys...")
+        cursor.execute(BACKFILL_SQL)
+        print("Done! Updated", cursor.rowcount, "courses.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import django
+
+# Add the backend directory to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from api.models import Course
+from api.services.catalog import ensure_catalog_schema, get_catalog
+from api.services.prereqs import RefResolver, compile_requisites
+
+# Usage:
+#   python scripts/compile_requisites.py          # courses whose program is missing or stale
+#   python scripts/compile_requisites.py --all    # everything (e.g. after new courses were added,
+#                                                 # so label references may now resolve)
+
+def main():
+    print("Ensuring catalog columns and tables (courses.requisites_program, course_prereq_depths, ...)...")
+    ensure_catalog_schema()
+
+    recompile_all = "--all" in sys.argv[1:]
+    resolve = RefResolver(get_catalog())
+
+    courses = Course.objects.only("id", "requisites_parsed", "updated_at", "requisites_compiled_at")
+    to_update = []
+    for c in courses.iterator(chunk_size=2000):
+        if not recompile_all and c.requisites_compiled_at is not None and c.requisites_compiled_at == c.updated_at:
+            continue
+        c.requisites_program = compile_requisites(c.requisites_parsed, resolve)
+        c.requisites_compiled_at = c.updated_at
+        to_update.append(c)
+
+    print(f"Compiled {len(to_update)} requisite programs, saving...")
+    Course.objects.bulk_update(to_update, ["requisites_program", "requisites_compiled_at"], batch_size=1000)
+    print("Done!")
+
+if __name__ == '__main__':
+    main()
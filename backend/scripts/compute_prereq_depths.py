@@ -0,0 +1,36 @@
+import os
+import sys
+import django
+
+# Add the backend directory to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from api.services.catalog import ensure_catalog_schema, get_catalog
+from api.services.prereqs import PrereqGraph, store_depths
+
+# Usage:
+#   python scripts/compute_prereq_depths.py
+# Re-run after importing courses or compiling requisites.
+
+def main():
+    print("Ensuring catalog columns and tables (course_prereq_depths, courses.requisites_program, ...)...")
+    ensure_catalog_schema()
+
+    catalog = get_catalog()
+    print(f"Computing prerequisite depths for {len(catalog.courses)} courses...")
+    rows = store_depths(PrereqGraph(catalog))
+
+    cyclic = [r for r in rows if r.in_cycle]
+    if cyclic:
+        labels = sorted(catalog.by_id[r.course_id]["label_key"] for r in cyclic)
+        print(f"Warning: {len(cyclic)} courses are on prerequisite cycles: {', '.join(labels)}")
+    unreachable = sum(1 for r in rows if r.layer is None)
+    if unreachable:
+        print(f"{unreachable} courses can never be satisfied (cycle with no way around it)")
+    deepest = max((r.chain_length for r in rows if r.chain_length is not None), default=0)
+    print("Done! Wrote", len(rows), "rows; longest prerequisite chain:", deepest)
+
+if __name__ == '__main__':
+    main()
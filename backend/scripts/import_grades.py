@@ -11,6 +11,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
 from api.models import Course, Subject, GradeDistribution
+from api.services.grades import ROLLUP_TABLE_SQL, course_ids_for_terms, refresh_rollups
 
 def get_term_label(term_code):
     term_code = str(term_code).strip()
@@ -49,9 +50,11 @@ def main():
         grades_json JSONB,
         total_enrolled INTEGER
     );
+    CREATE INDEX IF NOT EXISTS idx_grade_distributions_course ON grade_distributions (course_id);
     """
     with connection.cursor() as cursor:
         cursor.execute(create_table_sql)
+        cursor.execute(ROLLUP_TABLE_SQL)
     print("Table ensured!")
     
     if len(sys.argv) > 1:
@@ -144,5 +147,11 @@ def main():
     GradeDistribution.objects.bulk_create(objects_to_create, batch_size=1000)
     print("Done! Inserted", len(objects_to_create), "records.")
 
+    # Refresh rollups only for courses that have rows in the imported terms
+    imported_terms = {obj.term for obj in objects_to_create}
+    print("Refreshing grade rollups for terms:", ", ".join(sorted(imported_terms)))
+    written = refresh_rollups(course_ids_for_terms(imported_terms))
+    print("Done! Wrote", written, "rollup rows.")
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import django
+from django.db import connection
+
+# Add the backend directory to sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from api.models import GradeDistribution
+from api.services.grades import ROLLUP_TABLE_SQL, course_ids_for_terms, refresh_rollups
+
+# Usage:
+#   python scripts/refresh_grade_rollups.py                  # rebuild every course
+#   python scripts/refresh_grade_rollups.py "Fall 24" ...    # only courses with rows in these terms
+
+def main():
+    with connection.cursor() as cursor:
+        cursor.execute(ROLLUP_TABLE_SQL)
+
+    terms = sys.argv[1:]
+    if terms:
+        course_ids = course_ids_for_terms(terms)
+        print(f"Refreshing rollups for {len(course_ids)} courses in terms: {', '.join(terms)}")
+    else:
+        course_ids = set(
+            GradeDistribution.objects.filter(course_id__isnull=False)
+            .values_list("course_id", flat=True).distinct()
+        )
+        print(f"Rebuilding rollups for all {len(course_ids)} courses")
+
+    ids = sorted(course_ids)
+    written = 0
+    for start in range(0, len(ids), 1000):
+        written += refresh_rollups(ids[start:start + 1000])
+    print("Done! Wrote", written, "rollup rows.")
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,7 @@ function GradeDistributionChart({ courseId }) {
   useEffect(() => {
     async function fetchGrades() {
       try {
-        const res = await fetch(`${API_BASE}/api/courses/${courseId}/grades/`);
+        const res = await fetch(`${API_BASE}/api/courses/${courseId}/grades/?raw=1`);
         if (res.ok) {
           const json = await res.json();
           setData(json.grades || []);